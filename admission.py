@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import json
+import math
+
+from fastapi import HTTPException, Request
+
+from metrics import http_rejected
+from ratelimit import create_rate_limiter
+
+# Requests handled at once per process; up to MAX_QUEUED more wait at most
+# QUEUE_TIMEOUT seconds for a slot, anything beyond that is shed with a 503
+MAX_CONCURRENT = 64
+MAX_QUEUED = 128
+QUEUE_TIMEOUT = 2.0
+SHED_RETRY_AFTER = 1
+# Requests per second, and burst, allowed per API key on each route
+API_KEY_RATE = 100.0
+API_KEY_BURST = 200
+# Paths never shed, so monitoring keeps working under load
+EXEMPT_PATHS = ("/metrics",)
+
+
+def _retry_after(seconds):
+    return str(max(1, math.ceil(seconds)))
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware capping the requests a process handles at once
+
+    Requests over ``max_concurrent`` wait for a slot for up to
+    ``queue_timeout`` seconds; once ``max_queued`` are already waiting, or the
+    wait runs out, the request is answered straight away with a 503 and a
+    ``Retry-After`` header instead of joining an ever longer queue.
+
+    Args:
+        app: The ASGI application to wrap
+        max_concurrent (int): Requests handled at once
+        max_queued (int): Requests allowed to wait for a slot
+        queue_timeout (float): Seconds a request may wait for a slot
+    """
+
+    def __init__(
+        self,
+        app,
+        max_concurrent=MAX_CONCURRENT,
+        max_queued=MAX_QUEUED,
+        queue_timeout=QUEUE_TIMEOUT,
+    ):
+        self.app = app
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._queued = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        if self._slots.locked():
+            if self._queued >= self.max_queued:
+                await self._shed(send)
+                return
+            self._queued += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                await self._shed(send)
+                return
+            finally:
+                self._queued -= 1
+        else:
+            await self._slots.acquire()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._slots.release()
+
+    async def _shed(self, send):
+        http_rejected.inc("overloaded")
+        body = json.dumps({"detail": "Server is busy, please retry"}).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", _retry_after(SHED_RETRY_AFTER).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+
+class APIKeyRateLimit:
+    """
+    FastAPI dependency limiting each API key's requests per route
+
+    Requests are keyed by a hash of the API key header and the matched route
+    template. Requests without an API key are left to the admission limit.
+
+    Args:
+        header (str): The header carrying the API key
+        rate (float): Requests per second allowed per key and route
+        burst (int): Burst size allowed per key and route
+        path (str): SQLite database shared by all workers; None limits per process
+    """
+
+    def __init__(self, header, rate=API_KEY_RATE, burst=API_KEY_BURST, path=None):
+        self.header = header
+        self.limiter = create_rate_limiter(rate, burst, path)
+
+    async def __call__(self, request: Request):
+        api_key = request.headers.get(self.header)
+        if not api_key:
+            return
+        route = getattr(request.scope.get("route"), "path", request.url.path)
+        # Hashed so raw keys are never held by the limiter or written to its database
+        tenant = hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+        retry_after = self.limiter.try_acquire((tenant, route))
+        if retry_after:
+            http_rejected.inc("rate_limited")
+            raise HTTPException(
+                status_code=429,
+                detail="Too many requests for this API key",
+                headers={"Retry-After": _retry_after(retry_after)},
+            )
+
+
+def install(app, **kwargs):
+    """
+    Add the admission limit to a FastAPI app
+
+    Args:
+        app (FastAPI): The application to protect
+        **kwargs: ``AdmissionMiddleware`` settings
+    """
+    app.add_middleware(AdmissionMiddleware, **kwargs)
@@ -0,0 +1,248 @@
+import asyncio
+import gzip
+import io
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from metrics import observe_db
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIRECTORY = "assessments_archive"
+INDEX_NAME = "index.jsonl"
+
+# Statuses an assessment never leaves once reached, archived after TERMINAL_RETENTION;
+# assessments in any other status can still change and stay in the journal
+TERMINAL_STATUSES = ("completed", "abandoned", "failed", "cancelled", "archived")
+TERMINAL_RETENTION = timedelta(days=30)
+# Records moved out of the journal per lock hold; the event loop serves
+# requests between batches, so each one must be quick
+ARCHIVE_BATCH_SIZE = 500
+# How often the service runs a retention pass
+RETENTION_INTERVAL = 3600.0
+# Decompressed segments kept in memory for report lookups
+SEGMENT_CACHE_SIZE = 4
+
+
+def _segment_name(record):
+    # Partitioned by the month the assessment last changed
+    timestamp = record.get("updated_at") or record.get("created_at") or ""
+    month = timestamp[:7]
+    if len(month) != 7 or month[4] != "-" or not (month[:4] + month[5:]).isdigit():
+        month = "undated"
+    return f"assessments-{month}.jsonl.gz"
+
+
+def is_expired(record, now, terminal_retention=TERMINAL_RETENTION):
+    """
+    Decide whether an assessment is due for archiving
+
+    Args:
+        record (AssessmentRecord): The in-memory record
+        now (datetime): Current local time
+        terminal_retention (timedelta): Age at which terminal assessments are archived
+
+    Returns:
+        bool: True if the record should move to the archive
+    """
+    if record.get("status") not in TERMINAL_STATUSES:
+        return False
+    changed = record.get("updated_at") or record.get("created_at")
+    if not isinstance(changed, datetime):
+        # Records without a timestamp we understand are never archived
+        return False
+    return now - changed >= terminal_retention
+
+
+class AssessmentArchive:
+    """
+    Compressed, time-partitioned segments holding assessments moved out of the journal
+
+    Records are appended to ``assessments-YYYY-MM.jsonl.gz`` by the month they
+    last changed, one gzip member per batch, and each batch's ids are added to
+    ``index.jsonl`` together with the segment's new size. The index is only
+    read on the first lookup and then topped up with lines appended since, so
+    processes that never look up an archived assessment never load it. Writes
+    must be serialised across processes by the caller; ``archive_expired``
+    writes under the store lock.
+
+    Args:
+        directory (str): Directory holding the segments and index
+        segment_cache_size (int): Decompressed segments kept for lookups
+    """
+
+    def __init__(
+        self, directory=ARCHIVE_DIRECTORY, segment_cache_size=SEGMENT_CACHE_SIZE
+    ):
+        self.directory = directory
+        self.segment_cache_size = segment_cache_size
+        self._index = None
+        self._sizes = None
+        self._index_offset = 0
+        self._segments = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_NAME)
+
+    def get(self, id):
+        """
+        Look up an archived assessment
+
+        Args:
+            id (str): The assessment id
+
+        Returns:
+            dict | None: The archived record, or None if it was never archived
+        """
+        with self._lock:
+            self._refresh_index()
+            name = self._index.get(id)
+            if name is None:
+                return None
+            return self._segment(name).get(id)
+
+    def write(self, records):
+        """
+        Append records to their segments and the index, fsyncing both
+
+        A segment only counts up to the size recorded in the index, so a batch
+        cut short by a crash is truncated away before the next one is written.
+
+        Args:
+            records (list[dict]): The assessment records to archive
+        """
+        if not records:
+            return
+        started, size = time.perf_counter(), 0
+        os.makedirs(self.directory, exist_ok=True)
+        segments = {}
+        for record in records:
+            segments.setdefault(_segment_name(record), []).append(record)
+        with self._lock:
+            self._refresh_index()
+            entries = []
+            for name, batch in segments.items():
+                data = "".join(
+                    json.dumps(record, separators=(",", ":")) + "\n" for record in batch
+                )
+                with open(os.path.join(self.directory, name), "a+b") as file:
+                    file.truncate(self._sizes.get(name, 0))
+                    # Each batch is its own gzip member; readers see the concatenation
+                    with gzip.GzipFile(fileobj=file, mode="ab") as compressed:
+                        compressed.write(data.encode("utf-8"))
+                    file.flush()
+                    os.fsync(file.fileno())
+                    end = file.tell()
+                size += end - self._sizes.get(name, 0)
+                entries.append(
+                    {
+                        "segment": name,
+                        "size": end,
+                        "ids": [record["id"] for record in batch],
+                    }
+                )
+            # Written after the segments, so every indexed id can be found
+            data = "".join(json.dumps(entry) + "\n" for entry in entries).encode(
+                "utf-8"
+            )
+            with open(self.index_path, "a+b") as file:
+                file.truncate(self._index_offset)
+                file.write(data)
+                file.flush()
+                os.fsync(file.fileno())
+        observe_db("archive_write", started, size)
+
+    def _refresh_index(self):
+        try:
+            size = os.path.getsize(self.index_path)
+        except FileNotFoundError:
+            size = 0
+        if self._index is None:
+            self._index, self._sizes, self._index_offset = {}, {}, 0
+        if size <= self._index_offset:
+            return
+        started, start_offset = time.perf_counter(), self._index_offset
+        with open(self.index_path, "rb") as file:
+            file.seek(self._index_offset)
+            for line in file:
+                if not line.endswith(b"\n"):
+                    # Torn write from a crash; the next write truncates it
+                    break
+                entry = json.loads(line)
+                for id in entry["ids"]:
+                    self._index[id] = entry["segment"]
+                self._sizes[entry["segment"]] = entry["size"]
+                # Written to by another process since it was cached
+                self._segments.pop(entry["segment"], None)
+                self._index_offset += len(line)
+        observe_db("archive_index_read", started, self._index_offset - start_offset)
+
+    def _segment(self, name):
+        segment = self._segments.get(name)
+        if segment is not None:
+            self._segments.move_to_end(name)
+            return segment
+        started = time.perf_counter()
+        segment = {}
+        with open(os.path.join(self.directory, name), "rb") as raw:
+            # Ignore any batch past the size the index vouches for
+            data = raw.read(self._sizes[name])
+        with gzip.GzipFile(fileobj=io.BytesIO(data), mode="rb") as file:
+            for line in file:
+                record = json.loads(line)
+                segment[record["id"]] = record
+        observe_db("archive_read", started, len(data))
+        self._segments[name] = segment
+        while len(self._segments) > self.segment_cache_size:
+            self._segments.popitem(last=False)
+        return segment
+
+
+async def archive_expired(
+    store,
+    archive,
+    now=None,
+    terminal_retention=TERMINAL_RETENTION,
+    batch_size=ARCHIVE_BATCH_SIZE,
+):
+    """
+    Move every expired assessment from the store to the archive
+
+    Runs on the event loop one small batch at a time, yielding to other tasks
+    in between. Each batch is written to the archive before its records are
+    removed from the journal, so a crash in between leaves a record in both
+    places rather than in neither.
+
+    Args:
+        store (AssessmentStore): The hot store
+        archive (AssessmentArchive): The archive to move records into
+        now (datetime): Current local time, defaults to ``datetime.now()``
+        terminal_retention (timedelta): Age at which terminal assessments are archived
+        batch_size (int): Records moved per batch
+
+    Returns:
+        int: Number of assessments archived
+    """
+    now = now or datetime.now()
+    total = 0
+    while True:
+        removed = store.remove_where(
+            lambda record: is_expired(record, now, terminal_retention),
+            before_remove=archive.write,
+            limit=batch_size,
+            statuses=TERMINAL_STATUSES,
+        )
+        total += len(removed)
+        if len(removed) < batch_size:
+            break
+        await asyncio.sleep(0)
+    if total:
+        logger.info("Archived %d assessments", total)
+    return total
@@ -1,39 +1,94 @@
-from fastapi import FastAPI, HTTPException, Security, APIRouter, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from helpers import get_assessment_database, write_assessments_database
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Security, APIRouter, Request, Query, Depends
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
+from admission import APIKeyRateLimit
+from archive import RETENTION_INTERVAL, AssessmentArchive, archive_expired
+from helpers import get_assessment_store, insert_assessments
 from fastapi.security import APIKeyHeader
 from datetime import datetime
-import uuid
-from fastapi.templating import Jinja2Templates
-import requests
+from itertools import islice
+from typing import Any, Literal, Optional
+from http_caching import CachedPayload, PageCache
+from templating import create_environment, precompile
+from signing import derive_key
+from webhooks import WebhookDispatcher
+import csv
+import io
+import json
 import logging
+import admission
+import metrics
+from logs import configure_logging, fields
 
-# Configure logging with timestamps
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+# JSON lines through a background queue; payloads are only logged at DEBUG
+configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
-templates = Jinja2Templates(directory="templates")
+templates = create_environment()
+
+# Rendered report pages, re-rendered only when the fields they show change
+REPORT_CACHE_SIZE = 10000
+report_cache = PageCache(REPORT_CACHE_SIZE)
 
 
 api_key_header = APIKeyHeader(name="X_EXAMPLE_ASSESSMENTS_KEY")
 
 
+# Replace with your actual API key validation logic
+VALID_API_KEY = "ABCDEFG123456789"
+
+
 async def get_api_key(api_key: str = Security(api_key_header)):
-    # Replace with your actual API key validation logic
-    VALID_API_KEY = "ABCDEFG123456789"
     if api_key != VALID_API_KEY:
         raise HTTPException(status_code=401, detail="Invalid API Key")
     return api_key
 
 
-app = FastAPI()
+# Webhook bodies are signed in X-Verify with a key derived from the API key
+webhook_dispatcher = WebhookDispatcher(signing_key=derive_key(VALID_API_KEY))
+
+
+async def run_retention():
+    """Periodically move expired assessments out of the journal into the archive."""
+    while True:
+        try:
+            await archive_expired(assessments, archive)
+        except Exception:
+            logger.exception("Retention pass failed")
+        await asyncio.sleep(RETENTION_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    precompile(templates)
+    await webhook_dispatcher.start()
+    retention = asyncio.create_task(run_retention())
+    yield
+    retention.cancel()
+    await webhook_dispatcher.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+# Installed first so the metrics middleware also counts shed requests
+admission.install(app)
+metrics.install(app)
+
+# Set to a file path, e.g. "ratelimit.sqlite3", to share rate limits between workers
+RATE_LIMIT_DB_PATH = None
+api_key_rate_limit = APIKeyRateLimit(
+    "X_EXAMPLE_ASSESSMENTS_KEY", path=RATE_LIMIT_DB_PATH
+)
 
 # Create a router for protected routes and prefix them with /api
-protected_router = APIRouter(prefix="/api", dependencies=[Security(get_api_key)])
+protected_router = APIRouter(
+    prefix="/api", dependencies=[Security(get_api_key), Depends(api_key_rate_limit)]
+)
 
 allowed_statuses = [
     "pending",
@@ -44,7 +99,9 @@ allowed_statuses = [
     "archived",
     "not_started",
 ]
-assessments = get_assessment_database()
+assessments = get_assessment_store()
+# Old and finished assessments, moved out of the journal by run_retention()
+archive = AssessmentArchive()
 
 PACKAGES = {
     1: "Hello World: The Journey Begins",
@@ -70,52 +127,317 @@ async def read_assessments_list():
     return PACKAGES
 
 
-@protected_router.post("/assessments/")
-async def submit_assessment(assessment_details: dict):
-    """Submit a new assessment.
-    Args:
-        assessment_details (dict): The details of the assessment to submit.
-    """
+REQUIRED_ASSESSMENT_FIELDS = (
+    "id",
+    "name",
+    "email",
+    "packageId",
+    "webhookUrl",
+    "platformUrl",
+)
+# Entries accepted per /api/assessments/bulk call, all persisted in one write
+MAX_BULK_SIZE = 1000
 
-    id = uuid.uuid4()
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S %z").strip()
 
-    assessment = {
+def build_assessment(assessment_details, timestamp):
+    """Validate submitted assessment details and build the stored record.
+    Args:
+        assessment_details (dict): The details of the assessment to submit; bulk
+            entries arrive unchecked, so may be any JSON value.
+        timestamp (str): The creation timestamp to record.
+    Raises:
+        ValueError: If the details are not an object, a field is missing, the id
+            is not a string or the package does not exist.
+    """
+    if not isinstance(assessment_details, dict):
+        raise ValueError("Assessment details must be an object")
+    missing = [
+        field for field in REQUIRED_ASSESSMENT_FIELDS if field not in assessment_details
+    ]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    if not isinstance(assessment_details["id"], str):
+        raise ValueError("Assessment id must be a string")
+    try:
+        description = PACKAGES[int(assessment_details["packageId"])]
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Unknown package: {assessment_details['packageId']}")
+
+    return {
         "id": assessment_details["id"],
         "name": assessment_details["name"],
         "email": assessment_details["email"],
         "status": "pending",
-        # find the package with the id
-        "description": PACKAGES[int(assessment_details["packageId"])],
+        "description": description,
         "webhook_url": assessment_details["webhookUrl"],
         "platform_url": assessment_details["platformUrl"],
         "created_at": timestamp,
         "updated_at": timestamp,
     }
 
-    assessments.append(assessment)
-    write_assessments_database(assessments)
+
+@protected_router.post("/assessments/")
+async def submit_assessment(assessment_details: dict):
+    """Submit a new assessment.
+    An id that already exists is answered with 409 and the existing record,
+    which is left unchanged.
+    Args:
+        assessment_details (dict): The details of the assessment to submit.
+    """
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S %z").strip()
+    try:
+        assessment = build_assessment(assessment_details, timestamp)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    existing = insert_assessments([assessment])
+    if existing is None:
+        raise HTTPException(status_code=500, detail="Failed to persist assessment")
+    if existing:
+        return JSONResponse(
+            status_code=409,
+            content={
+                "detail": f"Assessment already exists: {assessment['id']}",
+                "assessment": existing[assessment["id"]],
+            },
+        )
     return assessment
 
 
+@protected_router.post("/assessments/bulk")
+async def submit_assessments_bulk(assessment_details: list[Any]):
+    """Submit many assessments at once.
+    Every entry is validated, the valid ones are persisted in a single write
+    and a result is returned for each entry in the order received. Entries
+    whose id already exists fail with the existing record attached. More than
+    MAX_BULK_SIZE entries are rejected with 422.
+    Args:
+        assessment_details (list): The details of each assessment to submit.
+    """
+    if len(assessment_details) > MAX_BULK_SIZE:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {MAX_BULK_SIZE} assessments are allowed per call",
+        )
+
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S %z").strip()
+    results = []
+    valid = []
+    seen = set()
+    for index, details in enumerate(assessment_details):
+        try:
+            assessment = build_assessment(details, timestamp)
+            if assessment["id"] in seen:
+                raise ValueError(f"Duplicate id in batch: {assessment['id']}")
+        except ValueError as e:
+            results.append({"index": index, "success": False, "error": str(e)})
+            continue
+        seen.add(assessment["id"])
+        valid.append(assessment)
+        results.append({"index": index, "success": True, "assessment": assessment})
+
+    existing = insert_assessments(valid) if valid else {}
+    if existing is None:
+        raise HTTPException(status_code=500, detail="Failed to persist assessments")
+    for result in results:
+        if result["success"] and result["assessment"]["id"] in existing:
+            id = result["assessment"]["id"]
+            result.update(
+                success=False,
+                error=f"Assessment already exists: {id}",
+                assessment=existing[id],
+            )
+    created = len(valid) - len(existing)
+    return {
+        "created": created,
+        "failed": len(results) - created,
+        "results": results,
+    }
+
+
+EXPORT_FIELDS = [
+    "id",
+    "name",
+    "email",
+    "status",
+    "score",
+    "description",
+    "webhook_url",
+    "platform_url",
+    "created_at",
+    "updated_at",
+]
+EXPORT_CHUNK_SIZE = 500
+MAX_PAGE_SIZE = 1000
+
+
+def parse_created_bound(name, value, end=False):
+    """Parse a created_from/created_to filter into the stored timestamp format.
+    Args:
+        name (str): The query parameter, for the error message.
+        value (str): An ISO 8601 date or date and time; aware times are
+            converted to local time.
+        end (bool): Whether a date-only value means the end of that day.
+    Raises:
+        HTTPException: 422 if the value is not a date or date and time.
+    """
+    if value is None:
+        return None
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(
+            status_code=422, detail=f"{name} must be an ISO 8601 date or date and time"
+        )
+    if moment.tzinfo is not None:
+        moment = moment.astimezone().replace(tzinfo=None)
+    if end and len(value) == 10:
+        moment = moment.replace(hour=23, minute=59, second=59)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def iter_assessments(
+    after=None, status=None, email=None, created_from=None, created_to=None
+):
+    """Yield assessments in creation order that match the given filters.
+    Args:
+        after (str): Only include assessments created after this assessment id.
+        status (str): Only include assessments with this status.
+        email (str): Only include assessments for this candidate email.
+        created_from (str): Only include assessments created at or after this
+            "%Y-%m-%d %H:%M:%S" timestamp, as returned by parse_created_bound.
+        created_to (str): Only include assessments created at or before this
+            "%Y-%m-%d %H:%M:%S" timestamp, as returned by parse_created_bound.
+    """
+    # created_at is stored as "%Y-%m-%d %H:%M:%S", so string comparison orders it
+    for assessment in assessments.scan(after=after, email=email, status=status):
+        if status is not None and assessment.get("status") != status:
+            continue
+        created_at = assessment.get("created_at", "")
+        if created_from is not None and created_at < created_from:
+            continue
+        if created_to is not None and created_at > created_to:
+            continue
+        yield assessment
+
+
+@protected_router.get("/assessments")
+async def list_assessments(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    status: Optional[str] = None,
+    email: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+):
+    """List assessments a page at a time.
+    Pass the returned next_cursor back as cursor to fetch the following page.
+    Args:
+        cursor (str): The next_cursor from the previous page.
+        limit (int): The maximum number of assessments to return.
+        status (str): Only include assessments with this status.
+        email (str): Only include assessments for this candidate email.
+        created_from (str): Only include assessments created at or after this timestamp.
+        created_to (str): Only include assessments created at or before this timestamp.
+    """
+    if cursor is not None and cursor not in assessments:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    created_from = parse_created_bound("created_from", created_from)
+    created_to = parse_created_bound("created_to", created_to, end=True)
+    page = list(
+        islice(
+            iter_assessments(cursor, status, email, created_from, created_to), limit + 1
+        )
+    )
+    has_more = len(page) > limit
+    page = page[:limit]
+    return {
+        "assessments": page,
+        "next_cursor": page[-1]["id"] if has_more else None,
+    }
+
+
+def _ndjson_chunks(records):
+    chunk = []
+    for record in records:
+        chunk.append(json.dumps(record))
+        if len(chunk) >= EXPORT_CHUNK_SIZE:
+            yield "\n".join(chunk) + "\n"
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk) + "\n"
+
+
+def _csv_chunks(records):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for count, record in enumerate(records, 1):
+        writer.writerow(record)
+        if count % EXPORT_CHUNK_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+@protected_router.get("/assessments/export")
+async def export_assessments(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    status: Optional[str] = None,
+    email: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+):
+    """Stream every matching assessment as NDJSON or CSV.
+    Records are read and written in small chunks, so memory use does not grow
+    with the size of the database.
+    Args:
+        format (str): Either "ndjson" or "csv".
+        status (str): Only include assessments with this status.
+        email (str): Only include assessments for this candidate email.
+        created_from (str): Only include assessments created at or after this timestamp.
+        created_to (str): Only include assessments created at or before this timestamp.
+    """
+    created_from = parse_created_bound("created_from", created_from)
+    created_to = parse_created_bound("created_to", created_to, end=True)
+    records = iter_assessments(None, status, email, created_from, created_to)
+    if format == "csv":
+        return StreamingResponse(
+            _csv_chunks(records),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=assessments.csv"},
+        )
+    return StreamingResponse(_ndjson_chunks(records), media_type="application/x-ndjson")
+
+
+@protected_router.get("/webhooks/stats")
+async def read_webhook_stats():
+    return webhook_dispatcher.stats()
+
+
+@protected_router.get("/webhooks/dead_letters")
+async def read_webhook_dead_letters(limit: int = 100):
+    return webhook_dispatcher.dead_letters(limit)
+
+
 @app.get("/assessments/{id}")
 async def read_assessment(id: str):
     """Render the assessment update page.
     Args:
         id (str): The ID of the assessment to render."""
-    for assessment in assessments:
-        if assessment["id"] == id:
-            return templates.TemplateResponse(
-                "update_assessment.html",
-                {
-                    "request": {},
-                    "assessment_id": id,
-                    "status": assessment.get("status"),
-                    "current_score": (
-                        assessment.get("score") if assessment.get("score") else ""
-                    ),
-                },
+    assessment = assessments.get(id)
+    if assessment is not None:
+        return HTMLResponse(
+            templates.get_template("update_assessment.html").render(
+                assessment_id=id,
+                status=assessment.get("status"),
+                current_score=(
+                    assessment.get("score") if assessment.get("score") else ""
+                ),
             )
+        )
 
     return HTMLResponse(
         content=f"<h1>Assessment ID: {id} not found</h1>", status_code=404
@@ -129,58 +451,103 @@ async def update_assessment(request: Request, id: str):
         request (Request): The incoming request object.
         id (str): The ID of the assessment to update."""
     form_data = await request.form()
-    logger.info(f"Assessment ID: {id}")
     status = form_data.get("status")
     if status not in allowed_statuses:
         return HTMLResponse(
             content=f"<h1>Status: {status} is not allowed. Allowed statuses are: {', '.join(allowed_statuses)}</h1>",
             status_code=400,
         )
-    for assessment in assessments:
-        if assessment["id"] == id:
-            assessment["status"] = status
-            assessment["score"] = form_data.get("score")
-            assessment["updated_at"] = (
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S %z").strip()
-            )
-            write_assessments_database(assessments)
-
-            payload = {
-                "id": id,
-                "status": form_data.get("status"),
-                "score": form_data.get("score"),
-                "report_path": f"reports/{assessment['id']}",
-            }
-            logger.info(f"Payload: {payload}")
-
-            requests.post(assessment["webhook_url"], json=payload, verify=False)
-            return RedirectResponse(url=f"/assessments/{id}", status_code=303)
+    # The provider turns every webhook event into a numeric Pinpoint score
+    try:
+        score = str(int(form_data.get("score")))
+    except (TypeError, ValueError):
+        return HTMLResponse(
+            content=f"<h1>Score: {form_data.get('score')} is not a number</h1>",
+            status_code=400,
+        )
+    # Read-modify-write under the store lock so concurrent workers never lose updates
+    assessment = assessments.update(
+        id,
+        {
+            "status": status,
+            "score": score,
+            "updated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S %z").strip(),
+        },
+    )
+    if assessment is not None:
+        report_cache.invalidate(id)
+        payload = {
+            "id": id,
+            "status": status,
+            "score": score,
+            "report_path": f"reports/{assessment['id']}",
+        }
+        logger.debug("Webhook payload queued", extra=fields(payload=payload))
+
+        # Delivered in the background so a slow webhook never holds up the form
+        webhook_dispatcher.enqueue(assessment["webhook_url"], payload)
+        return RedirectResponse(url=f"/assessments/{id}", status_code=303)
 
     return HTMLResponse(
         content=f"<h1>Assessment ID: {id} not found</h1>", status_code=404
     )
 
 
+def _modified_at(assessment):
+    """Return when an assessment last changed as a Unix time, or None if unknown."""
+    timestamp = assessment.get("updated_at") or assessment.get("created_at") or ""
+    try:
+        # Stored as local time by datetime.now(), formatted "%Y-%m-%d %H:%M:%S"
+        return datetime.strptime(timestamp[:19], "%Y-%m-%d %H:%M:%S").timestamp()
+    except ValueError:
+        return None
+
+
+def get_report_payload(id, assessment):
+    """Return the rendered report page, rendering it only when its fields changed.
+    Args:
+        id (str): The ID of the assessment.
+        assessment (dict): The stored assessment record.
+    """
+    context = {
+        "assessment_id": id,
+        "status": assessment.get("status"),
+        "score": assessment.get("score"),
+        "candidate_name": assessment.get("name"),
+        "description": assessment.get("description"),
+        "assessment_date": assessment.get("created_at"),
+    }
+    # Keyed on everything the page shows plus updated_at, so other workers'
+    # updates are picked up without any cross-process invalidation
+    version = (*context.values(), assessment.get("updated_at"))
+    payload = report_cache.get(id, version)
+    if payload is None:
+        payload = CachedPayload(
+            templates.get_template("report.html").render(context).encode("utf-8"),
+            media_type="text/html; charset=utf-8",
+            headers={"Cache-Control": "no-cache"},
+            last_modified=_modified_at(assessment),
+        )
+        report_cache.set(id, version, payload)
+    return payload
+
+
 @app.get("/assessments/reports/{id}")
-async def read_assessment_report(id: str):
+async def read_assessment_report(request: Request, id: str):
     """Render the assessment report page.
+    Served from the report cache with ETag and Last-Modified, so repeat
+    visits to a shared link get a 304. Assessments that have been archived
+    are looked up in the archive.
     Args:
+        request (Request): The incoming request object.
         id (str): The ID of the assessment to render.
     """
-    for assessment in assessments:
-        if assessment["id"] == id:
-            return templates.TemplateResponse(
-                "report.html",
-                {
-                    "request": {},
-                    "assessment_id": id,
-                    "status": assessment.get("status"),
-                    "score": assessment.get("score"),
-                    "candidate_name": assessment.get("name"),
-                    "description": assessment.get("description"),
-                    "assessment_date": assessment.get("created_at"),
-                },
-            )
+    assessment = assessments.get(id)
+    if assessment is None:
+        # Decompressing a segment is too slow for the event loop
+        assessment = await asyncio.to_thread(archive.get, id)
+    if assessment is not None:
+        return get_report_payload(id, assessment).response(request)
     return HTMLResponse(
         content=f"<h1>Assessment Report ID: {id} not found</h1>", status_code=404
     )
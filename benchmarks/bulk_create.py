@@ -0,0 +1,73 @@
+"""Bulk versus one-by-one assessment creation in the assessment service.
+
+Creates each batch once through ``/api/assessments/bulk`` and once as
+individual ``/api/assessments/`` calls, in-process with a fresh database.
+
+Run from the repository root:
+
+    python -m benchmarks.bulk_create --sizes 1 100 10000
+"""
+
+import argparse
+import os
+import time
+import uuid
+
+from benchmarks.servers import scratch_directory
+
+API_KEY_HEADER = {"X_EXAMPLE_ASSESSMENTS_KEY": "ABCDEFG123456789"}
+
+
+def assessment_details():
+    return {
+        "id": str(uuid.uuid4()),
+        "name": "Bulk Candidate",
+        "email": "bulk@example.com",
+        "packageId": "3",
+        "webhookUrl": "http://127.0.0.1:9/webhook",
+        "platformUrl": "http://127.0.0.1:9/redirect",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 10_000])
+    args = parser.parse_args()
+
+    with scratch_directory() as directory:
+        os.chdir(directory)
+        # Imported here so the service opens its database in the scratch directory
+        from fastapi.testclient import TestClient
+        import assessment_service
+
+        # Time the writes, not the per-key rate limit
+        assessment_service.api_key_rate_limit.limiter.capacity = float("inf")
+        client = TestClient(assessment_service.app)
+        client.post("/api/assessments/bulk", json=[], headers=API_KEY_HEADER)
+        print(
+            f"{'batch':>7} {'bulk (ms)':>10} {'per item (us)':>14} {'single calls (ms)':>18}"
+        )
+        for size in args.sizes:
+            batch = [assessment_details() for _ in range(size)]
+            start = time.perf_counter()
+            response = client.post(
+                "/api/assessments/bulk", json=batch, headers=API_KEY_HEADER
+            )
+            bulk = time.perf_counter() - start
+            assert response.json()["created"] == size
+
+            start = time.perf_counter()
+            for _ in range(size):
+                client.post(
+                    "/api/assessments/",
+                    json=assessment_details(),
+                    headers=API_KEY_HEADER,
+                )
+            single = time.perf_counter() - start
+            print(
+                f"{size:>7} {bulk * 1000:>10.1f} {bulk / size * 1e6:>14.1f} {single * 1000:>18.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Concurrent /create_assessment throughput against a local assessment service.
+
+Starts ``assessment_service`` on port 8001 (where the provider expects it) and
+``provider`` on ``--provider-port``, then fires ``--requests`` create calls
+with ``--concurrency`` in flight. Run it on two commits to compare them.
+
+Run from the repository root:
+
+    python -m benchmarks.create_assessment_load --concurrency 50
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from benchmarks.servers import run_server, scratch_directory
+
+API_KEY = "ABCDEFG123456789"
+
+
+def form_payload(index):
+    return {
+        "formFields": [
+            {"key": "firstName", "value": f"Load{index}"},
+            {"key": "lastName", "value": "Test"},
+            {"key": "email", "value": f"load{index}@example.com"},
+            {"key": "selectedTest", "value": "1"},
+        ],
+        "webhookUrl": "http://127.0.0.1:9/webhook",
+        "generatedUuidRedirectUrl": "http://127.0.0.1:9/redirect",
+    }
+
+
+async def drive(base_url, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    failures = 0
+
+    async with httpx.AsyncClient(
+        base_url=base_url,
+        limits=httpx.Limits(max_connections=concurrency),
+        timeout=60.0,
+        headers={"x_example_base_url": "http://127.0.0.1:8001"},
+    ) as client:
+
+        async def one(index):
+            nonlocal failures
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post(
+                    "/create_assessment", json=form_payload(index)
+                )
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200 or not response.json().get("success"):
+                    failures += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "failures": failures,
+        "throughput_rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--provider-port", type=int, default=8000)
+    args = parser.parse_args()
+
+    with scratch_directory() as directory:
+        with run_server("assessment_service", 8001, directory), run_server(
+            "provider", args.provider_port, directory
+        ) as provider_url:
+            result = asyncio.run(drive(provider_url, args.requests, args.concurrency))
+
+    for key, value in result.items():
+        print(
+            f"{key:>15}: {value:.1f}"
+            if isinstance(value, float)
+            else f"{key:>15}: {value}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Form field lookup cost by form size.
+
+Compares the six ``get_field_value`` scans ``create_assessment`` used to do
+per request against building a ``ParsedForm`` once and reading from it.
+
+Run from the repository root:
+
+    python -m benchmarks.form_lookup --sizes 10 100 1000
+"""
+
+import argparse
+import timeit
+
+from helpers import ParsedForm, get_field_value
+
+# The keys create_assessment reads, in the order it reads them
+LOOKUPS = ["firstName", "lastName", "email", "selectedTest", "firstName", "lastName"]
+
+
+def make_form(size):
+    custom = [
+        {"key": f"custom{i}", "value": str(i)} for i in range(size - len(set(LOOKUPS)))
+    ]
+    # Put the fields we need at the end, the worst case for a linear scan
+    return {
+        "formFields": custom
+        + [
+            {"key": "firstName", "value": "Ada"},
+            {"key": "lastName", "value": "Lovelace"},
+            {"key": "email", "value": "ada@example.com"},
+            {"key": "selectedTest", "value": "1"},
+        ],
+        "configurationValues": [{"key": "apiKey", "value": "ABCDEFG123456789"}],
+    }
+
+
+def scan_lookups(form_data):
+    return [get_field_value(form_data, key) for key in LOOKUPS]
+
+
+def parsed_lookups(form_data):
+    form = ParsedForm(form_data)
+    return [form.field(key) for key in LOOKUPS]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'fields':>7} {'scans (us)':>11} {'parsed (us)':>12}")
+    for size in args.sizes:
+        form_data = make_form(size)
+        assert scan_lookups(form_data) == parsed_lookups(form_data)
+        scan = min(
+            timeit.repeat(lambda: scan_lookups(form_data), number=args.number, repeat=5)
+        )
+        parsed = min(
+            timeit.repeat(
+                lambda: parsed_lookups(form_data), number=args.number, repeat=5
+            )
+        )
+        print(
+            f"{size:>7} {scan / args.number * 1e6:>11.2f} {parsed / args.number * 1e6:>12.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
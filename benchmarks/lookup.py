@@ -0,0 +1,89 @@
+"""Assessment lookup latency by database size.
+
+Compares the indexed ``AssessmentStore.get``/``find_by_*`` lookups against the
+linear scan the service used to do.
+
+Run from the repository root:
+
+    python -m benchmarks.lookup --sizes 100 10000 1000000
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from storage import AssessmentStore
+
+STATUSES = ["pending", "completed", "failed", "cancelled"]
+
+
+def make_records(count):
+    return [
+        {
+            "id": f"assessment-{i}",
+            "name": f"Candidate {i}",
+            "email": f"candidate{i % (count // 2 or 1)}@example.com",
+            "status": STATUSES[i % len(STATUSES)],
+        }
+        for i in range(count)
+    ]
+
+
+def time_per_call(func, keys):
+    start = time.perf_counter()
+    for key in keys:
+        func(key)
+    return (time.perf_counter() - start) / len(keys) * 1e6
+
+
+def linear_scan(records, id):
+    for record in records:
+        if record["id"] == id:
+            return record
+    return None
+
+
+def run(size, lookups, scans):
+    with tempfile.TemporaryDirectory() as directory:
+        store = AssessmentStore(
+            path=os.path.join(directory, "db.jsonl"),
+            legacy_path=os.path.join(directory, "missing.json"),
+            fsync=False,
+        )
+        records = make_records(size)
+        store.replace_all(records)
+
+        ids = [f"assessment-{random.randrange(size)}" for _ in range(lookups)]
+        emails = [store.get(id)["email"] for id in ids]
+        return {
+            "size": size,
+            "get_us": time_per_call(store.get, ids),
+            "find_by_email_us": time_per_call(store.find_by_email, emails),
+            "linear_scan_us": time_per_call(
+                lambda id: linear_scan(records, id), ids[:scans]
+            ),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--scans", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'records':>10} {'get (us)':>10} {'by email (us)':>14} {'scan (us)':>12}")
+    for size in args.sizes:
+        result = run(size, args.lookups, args.scans)
+        print(
+            f"{result['size']:>10} {result['get_us']:>10.3f} "
+            f"{result['find_by_email_us']:>14.3f} {result['linear_scan_us']:>12.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
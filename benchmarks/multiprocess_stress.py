@@ -0,0 +1,116 @@
+"""Multi-process stress check for the assessment journal.
+
+Starts several processes on one shared journal, the way ``uvicorn --workers``
+does. Each process creates its own assessments and repeatedly updates its own
+field on one shared assessment, then the journal is reloaded and checked for
+lost records and lost updates.
+
+Run from the repository root:
+
+    python -m benchmarks.multiprocess_stress --processes 4 --writes 500
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+
+from benchmarks.servers import scratch_directory
+from storage import AssessmentStore
+
+SHARED_ID = "shared"
+
+
+def make_assessment(id, index):
+    return {
+        "id": id,
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "email": f"candidate{index}@example.com",
+        "package_id": "1",
+        "status": "sent",
+        "webhook_url": "http://localhost:8000/webhook",
+        "created_at": "2024-01-01 00:00:00",
+    }
+
+
+def work(path, process, writes, compact_every):
+    store = AssessmentStore(path=path, legacy_path=f"{path}.missing", fsync=False)
+    for index in range(writes):
+        store.put(make_assessment(f"p{process}-{index}", index))
+        # Every process bumps its own counter on the same record; a lost update
+        # would leave a counter behind
+        store.update(SHARED_ID, {f"p{process}": index + 1})
+        if compact_every and index % compact_every == compact_every - 1:
+            store.compact()
+    store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--writes", type=int, default=500)
+    parser.add_argument(
+        "--compact-every",
+        type=int,
+        default=100,
+        help="Force a compaction every N writes (0 = never)",
+    )
+    args = parser.parse_args()
+
+    with scratch_directory() as directory:
+        path = os.path.join(directory, "assessments_database.jsonl")
+        store = AssessmentStore(path=path, legacy_path=f"{path}.missing", fsync=False)
+        store.put(make_assessment(SHARED_ID, 0))
+
+        start = time.perf_counter()
+        processes = [
+            multiprocessing.Process(
+                target=work, args=(path, process, args.writes, args.compact_every)
+            )
+            for process in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = time.perf_counter() - start
+        failed = [process.exitcode for process in processes if process.exitcode != 0]
+        assert not failed, f"worker processes exited with {failed}"
+
+        # The long-lived store must see other processes' writes without a reload
+        shared = store.get(SHARED_ID)
+        live_records = len(store)
+        store.close()
+        reloaded = AssessmentStore(
+            path=path, legacy_path=f"{path}.missing", fsync=False
+        )
+
+        expected_records = args.processes * args.writes + 1
+        missing = [
+            f"p{process}-{index}"
+            for process in range(args.processes)
+            for index in range(args.writes)
+            if reloaded.get(f"p{process}-{index}") is None
+        ]
+        lost_updates = {
+            f"p{process}": reloaded.get(SHARED_ID).get(f"p{process}")
+            for process in range(args.processes)
+            if reloaded.get(SHARED_ID).get(f"p{process}") != args.writes
+        }
+        operations = args.processes * args.writes * 2
+        print(f"processes:        {args.processes}")
+        print(
+            f"operations:       {operations} in {elapsed:.2f}s ({operations / elapsed:.0f}/s)"
+        )
+        print(f"records:          {len(reloaded)} / {expected_records}")
+        print(f"missing records:  {len(missing)}")
+        print(f"lost updates:     {lost_updates or 'none'}")
+        assert live_records == expected_records and shared == reloaded.get(SHARED_ID)
+        assert not missing and not lost_updates
+        reloaded.close()
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Memory held by assessment records: plain dicts against ``AssessmentRecord``.
+
+Builds ``--count`` records the way the journal loader does, one
+``json.loads`` per line so no strings are shared between records, then
+measures the memory they hold with ``tracemalloc``, once kept as dicts and
+once converted to slotted ``AssessmentRecord`` objects. Every converted
+record is checked to round-trip back to the same dict.
+
+Run from the repository root:
+
+    python -m benchmarks.record_memory --count 1000000
+"""
+
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from records import AssessmentRecord
+
+DESCRIPTIONS = (
+    "Hello World: The Journey Begins",
+    "99 Problems But a Syntax Ain't One",
+    "Pandas: Not Just Cute Bears",
+)
+STATUSES = ("pending", "completed", "abandoned")
+
+
+def make_line(index):
+    record = {
+        "id": f"{index:08d}-5c1f-4a0e-9d59-3f7f0f2b9c11",
+        "name": f"Candidate {index}",
+        "email": f"candidate{index}@example.com",
+        "status": STATUSES[index % 3],
+        "description": DESCRIPTIONS[index % 3],
+        "webhook_url": "https://pinpoint.example.com/webhooks/assessments",
+        "platform_url": "https://pinpoint.example.com",
+        "created_at": "2025-01-01 09:00:00",
+        "updated_at": "2025-01-02 17:30:00",
+    }
+    if index % 3 == 1:
+        record["score"] = str(index % 100)
+    return json.dumps(record).encode("utf-8")
+
+
+def measure(lines, build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    records = [build(json.loads(line)) for line in lines]
+    elapsed = time.perf_counter() - started
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return records, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    lines = [make_line(index) for index in range(args.count)]
+
+    records, dict_bytes, dict_seconds = measure(lines, lambda record: record)
+    del records
+    records, slotted_bytes, slotted_seconds = measure(lines, AssessmentRecord.from_dict)
+    for line, record in zip(lines, records):
+        assert record.to_dict() == json.loads(line), line
+
+    print(f"{args.count} records")
+    for label, size, seconds in (
+        ("dict", dict_bytes, dict_seconds),
+        ("AssessmentRecord", slotted_bytes, slotted_seconds),
+    ):
+        print(
+            f"{label:<18} {size / 2**20:>8.1f} MB {size / args.count:>7.0f} B/record "
+            f"{seconds:>7.2f}s to build"
+        )
+    print(f"saved {(1 - slotted_bytes / dict_bytes) * 100:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
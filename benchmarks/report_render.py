@@ -0,0 +1,102 @@
+"""Report page cost: template load, rendering and the report cache.
+
+Measures loading ``report.html`` with and without the bytecode cache (what a
+cold worker pays), rendering it on every hit, and serving it from the
+``PageCache`` including the conditional GET check.
+
+Run from the repository root:
+
+    python -m benchmarks.report_render
+"""
+
+import argparse
+import os
+import tempfile
+import timeit
+
+from starlette.requests import Request
+
+from http_caching import CachedPayload, PageCache
+from templating import create_environment
+
+CONTEXT = {
+    "assessment_id": "0d6f8a5e-5c1f-4a0e-9d59-3f7f0f2b9c11",
+    "status": "completed",
+    "score": "87",
+    "candidate_name": "Ada Lovelace",
+    "description": "Hello World: The Journey Begins",
+    "assessment_date": "2025-01-01 09:00:00",
+}
+
+
+def make_request(headers=()):
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "path": "/",
+            "headers": [(name.encode(), value.encode()) for name, value in headers],
+        }
+    )
+
+
+def load_time(cache_directory, number):
+    # A fresh environment per load, like a freshly started worker
+    return (
+        min(
+            timeit.repeat(
+                lambda: create_environment(
+                    cache_directory=cache_directory
+                ).get_template("report.html"),
+                number=number,
+                repeat=5,
+            )
+        )
+        / number
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache_directory = os.path.join(directory, "bytecode")
+        create_environment(cache_directory=cache_directory).get_template("report.html")
+        compile_seconds = load_time(None, 50)
+        bytecode_seconds = load_time(cache_directory, 50)
+
+    environment = create_environment(cache_directory=None)
+    template = environment.get_template("report.html")
+    cache = PageCache(100)
+    version = tuple(CONTEXT.values())
+
+    def render():
+        return CachedPayload(template.render(CONTEXT).encode("utf-8"), "text/html")
+
+    def cached(request):
+        payload = cache.get(CONTEXT["assessment_id"], version)
+        if payload is None:
+            payload = render()
+            cache.set(CONTEXT["assessment_id"], version, payload)
+        return payload.response(request)
+
+    plain = make_request()
+    etag = render().etag()
+    conditional = make_request([("if-none-match", etag)])
+    cases = {
+        "render every hit": lambda: render().response(plain),
+        "cached": lambda: cached(plain),
+        "cached, 304": lambda: cached(conditional),
+    }
+
+    print(f"{'template load, compile':<26} {compile_seconds * 1e6:>9.1f} us")
+    print(f"{'template load, bytecode':<26} {bytecode_seconds * 1e6:>9.1f} us")
+    for label, func in cases.items():
+        seconds = min(timeit.repeat(func, number=args.number, repeat=5)) / args.number
+        print(f"{label:<26} {seconds * 1e6:>9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
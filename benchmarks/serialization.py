@@ -0,0 +1,116 @@
+"""Per-response serialisation cost of the provider response models.
+
+Compares FastAPI's generic path (``jsonable_encoder`` then ``JSONResponse``)
+for a plain dict and for a model against ``ModelResponse``, which hands the
+model straight to pydantic-core.
+
+Run from the repository root:
+
+    python -m benchmarks.serialization
+"""
+
+import argparse
+import timeit
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from models import ExportResponse, WebhookResponse
+from responses import ModelResponse
+
+
+def export_response(options):
+    return {
+        "actionVersion": "1.0.0",
+        "key": "createAssessment",
+        "label": "Send to ExampleAssessments",
+        "description": "Sends a candidate to the internal ExampleAssessments system",
+        "formFields": [
+            {
+                "key": "selectedTest",
+                "label": "Selected Test",
+                "placeholder": "Select test...",
+                "type": "string",
+                "required": True,
+                "value": "",
+                "singleSelectOptions": [
+                    {"label": f"Package {i}", "value": str(i)} for i in range(options)
+                ],
+            },
+            {
+                "key": "firstName",
+                "label": "First Name",
+                "type": "string",
+                "required": True,
+                "readonly": False,
+                "includeValueInRefetch": True,
+            },
+            {
+                "key": "lastName",
+                "label": "Last Name",
+                "type": "string",
+                "required": True,
+                "readonly": False,
+            },
+        ],
+        "submitEndpoint": "/create_assessment",
+    }
+
+
+def webhook_response():
+    return {
+        "resultVersion": "1.0.0",
+        "success": True,
+        "updateAssessments": [
+            {
+                "externalIdentifier": "0d6f8a5e-5c1f-4a0e-9d59-3f7f0f2b9c11",
+                "status": "completed",
+                "score": 87,
+                "shouldNotify": True,
+                "externalLinks": [
+                    {
+                        "key": "report",
+                        "label": "Report",
+                        "url": "http://localhost:8001/assessments/reports/0d6f8a5e",
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def measure(name, payload, model_class, number):
+    model = model_class.model_validate(payload)
+    cases = {
+        "dict via jsonable_encoder": lambda: JSONResponse(jsonable_encoder(payload)),
+        "model via jsonable_encoder": lambda: JSONResponse(
+            jsonable_encoder(model, exclude_none=True)
+        ),
+        "ModelResponse": lambda: ModelResponse(model),
+        "validate + ModelResponse": lambda: ModelResponse(
+            model_class.model_validate(payload)
+        ),
+    }
+    print(name)
+    for label, func in cases.items():
+        seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+        print(f"  {label:<28} {seconds * 1e6:>8.1f} us")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2000)
+    parser.add_argument("--options", type=int, default=10)
+    args = parser.parse_args()
+
+    measure(
+        f"ExportResponse ({args.options} packages)",
+        export_response(args.options),
+        ExportResponse,
+        args.number,
+    )
+    measure("WebhookResponse", webhook_response(), WebhookResponse, args.number)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Helpers for starting the services on localhost for benchmarks."""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@contextmanager
+def scratch_directory():
+    """Yield a temporary working directory holding a copy of the templates and assets"""
+    with tempfile.TemporaryDirectory() as directory:
+        shutil.copytree(
+            os.path.join(REPO_ROOT, "templates"), os.path.join(directory, "templates")
+        )
+        for asset in ("logo.png", "action-logo.svg"):
+            shutil.copy(os.path.join(REPO_ROOT, asset), directory)
+        yield directory
+
+
+@contextmanager
+def run_server(module, port, cwd, workers=1, env=None):
+    """
+    Run ``module:app`` under uvicorn on localhost until the context exits
+
+    Args:
+        module (str): Module holding the FastAPI ``app``
+        port (int): Port to listen on
+        cwd (str): Working directory, which is where the service keeps its data
+        workers (int): Number of uvicorn worker processes
+        env (dict): Extra environment variables for the server
+    """
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            f"{module}:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        cwd=cwd,
+        env={**os.environ, "PYTHONPATH": REPO_ROOT, **(env or {})},
+    )
+    try:
+        wait_until_ready(f"http://127.0.0.1:{port}/hello")
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def wait_until_ready(url, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(url).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
@@ -0,0 +1,86 @@
+"""Assessment store startup: JSON journal replay against the index snapshot.
+
+For each size a journal is written, then loaded in a fresh process three
+ways: parsing every JSON line, parsing every line and saving the index
+snapshot (what the first start after an upgrade pays), and starting warm from
+that snapshot. Load time and the peak resident memory of the loading process
+are reported.
+
+Run from the repository root:
+
+    python -m benchmarks.startup --sizes 10000 100000 200000
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+
+from benchmarks.servers import scratch_directory
+from storage import SNAPSHOT_SUFFIX, AssessmentStore
+
+
+def make_assessment(index):
+    return {
+        "id": f"{index:08d}-5c1f-4a0e-9d59-3f7f0f2b9c11",
+        "first_name": "Ada",
+        "last_name": "Lovelace",
+        "email": f"candidate{index}@example.com",
+        "package_id": "1",
+        "status": ("sent", "in_progress", "completed")[index % 3],
+        "score": str(index % 100) if index % 3 == 2 else None,
+        "webhook_url": "http://localhost:8000/webhook",
+        "created_at": "2024-01-01 00:00:00",
+    }
+
+
+def load(path, snapshot, results):
+    started = time.perf_counter()
+    store = AssessmentStore(
+        path=path, legacy_path=f"{path}.missing", fsync=False, snapshot=snapshot
+    )
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in kilobytes on Linux
+    results.put(
+        (elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, len(store))
+    )
+
+
+def measure(path, snapshot):
+    results = multiprocessing.Queue()
+    process = multiprocessing.Process(target=load, args=(path, snapshot, results))
+    process.start()
+    result = results.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10_000, 100_000, 200_000]
+    )
+    args = parser.parse_args()
+
+    print(f"{'records':>8} {'load':<22} {'seconds':>8} {'peak MB':>8}")
+    with scratch_directory() as directory:
+        for size in args.sizes:
+            path = os.path.join(directory, f"journal-{size}.jsonl")
+            AssessmentStore(
+                path=path, legacy_path=f"{path}.missing", fsync=False
+            ).put_many([make_assessment(index) for index in range(size)])
+            cases = (
+                ("JSON lines", False),
+                ("JSON lines, save index", True),
+                ("index snapshot", True),
+            )
+            for label, snapshot in cases:
+                seconds, peak, count = measure(path, snapshot)
+                assert count == size, (label, count)
+                print(f"{size:>8} {label:<22} {seconds:>8.2f} {peak:>8.1f}")
+            os.remove(f"{path}{SNAPSHOT_SUFFIX}")
+
+
+if __name__ == "__main__":
+    main()
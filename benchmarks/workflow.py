@@ -0,0 +1,347 @@
+"""End-to-end benchmark of the Pinpoint plugin workflow.
+
+Starts ``assessment_service`` on port 8001 and ``provider`` on
+``--provider-port``, plus an in-process stub standing in for Pinpoint's
+webhook receiver. Each virtual user then runs the full flow:
+
+    POST /                          provider config
+    POST /export                    package form
+    POST /create_assessment         provider -> assessment service
+    POST /assessments/{id}/update   assessment service, queues the webhook
+    (webhook delivery)              assessment service -> stub receiver
+    POST /webhook                   stub payload handed to the provider
+
+Latency percentiles and throughput are reported per step and written to
+``--output`` as JSON; pass an earlier result file as ``--compare`` to see
+the change against another commit.
+
+Run from the repository root:
+
+    python -m benchmarks.workflow --flows 500 --concurrency 20 --output workflow.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import httpx
+
+from benchmarks.servers import REPO_ROOT, run_server, scratch_directory
+
+API_KEY = "ABCDEFG123456789"
+ASSESSMENT_SERVICE_URL = "http://127.0.0.1:8001"
+STEPS = (
+    "config",
+    "export",
+    "create_assessment",
+    "update",
+    "webhook_delivery",
+    "webhook",
+)
+
+
+class WebhookReceiver:
+    """
+    Minimal HTTP server standing in for Pinpoint's webhook endpoint
+
+    Every POST body is decoded and each event in it resolves the waiter for its
+    assessment id with the raw body and its ``X-Verify`` signature, so the
+    harness can time delivery and replay the signed payload.
+    """
+
+    def __init__(self):
+        self._waiters = {}
+        self._server = None
+        self._connections = {}
+
+    async def start(self, port):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", port)
+        return f"http://127.0.0.1:{port}/webhook"
+
+    async def stop(self):
+        self._server.close()
+        for writer in list(self._connections):
+            writer.close()
+        # Let the handlers see the closed connections and finish before the loop ends
+        await asyncio.gather(*self._connections.values(), return_exceptions=True)
+        await self._server.wait_closed()
+
+    def expect(self, id):
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[id] = future
+        return future
+
+    async def _handle(self, reader, writer):
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length, signature = 0, ""
+                for line in head.split(b"\r\n")[1:]:
+                    name, _, value = line.partition(b":")
+                    name = name.strip().lower()
+                    if name == b"content-length":
+                        length = int(value)
+                    elif name == b"x-verify":
+                        signature = value.strip().decode()
+                body = await reader.readexactly(length) if length else b""
+                writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\n\r\n")
+                await writer.drain()
+                self._receive(body, signature)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    def _receive(self, body, signature):
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            return
+        events = (
+            payload["events"]
+            if isinstance(payload, dict) and "events" in payload
+            else [payload]
+        )
+        for event in events:
+            future = self._waiters.pop(event.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result((body, signature))
+
+
+def form_payload(index, webhook_url):
+    return {
+        "formFields": [
+            {"key": "firstName", "value": f"Flow{index}"},
+            {"key": "lastName", "value": "Test"},
+            {"key": "email", "value": f"flow{index}@example.com"},
+            {"key": "selectedTest", "value": "1"},
+        ],
+        "configurationValues": [{"key": "apiKey", "value": API_KEY}],
+        "webhookUrl": webhook_url,
+        "generatedUuidRedirectUrl": "http://127.0.0.1:9/redirect",
+    }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(
+        len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1)
+    )
+    return sorted_values[index]
+
+
+def summarise(latencies, failures, elapsed):
+    steps = {}
+    for step in STEPS:
+        values = sorted(latencies[step])
+        steps[step] = {
+            "count": len(values),
+            "failures": failures[step],
+            "throughput_rps": len(values) / elapsed if elapsed else 0.0,
+            "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+            "p50_ms": percentile(values, 0.50) * 1000,
+            "p95_ms": percentile(values, 0.95) * 1000,
+            "p99_ms": percentile(values, 0.99) * 1000,
+        }
+    return steps
+
+
+async def drive(
+    provider_url, receiver, webhook_url, flows, concurrency, delivery_timeout
+):
+    latencies = {step: [] for step in STEPS}
+    failures = {step: 0 for step in STEPS}
+    limits = httpx.Limits(max_connections=concurrency)
+    provider = httpx.AsyncClient(base_url=provider_url, limits=limits, timeout=60.0)
+    service = httpx.AsyncClient(
+        base_url=ASSESSMENT_SERVICE_URL, limits=limits, timeout=60.0
+    )
+
+    async def timed(step, call, ok):
+        start = time.perf_counter()
+        try:
+            response = await call
+        except httpx.HTTPError:
+            failures[step] += 1
+            return None
+        latencies[step].append(time.perf_counter() - start)
+        if not ok(response):
+            failures[step] += 1
+            return None
+        return response
+
+    async def flow(index):
+        await timed("config", provider.post("/"), lambda r: r.status_code == 200)
+        await timed(
+            "export",
+            provider.post("/export", headers={"x_example_assessments_key": API_KEY}),
+            lambda r: r.status_code == 200,
+        )
+        created = await timed(
+            "create_assessment",
+            provider.post(
+                "/create_assessment",
+                json=form_payload(index, webhook_url),
+                headers={
+                    "x_example_assessments_key": API_KEY,
+                    "x_example_base_url": ASSESSMENT_SERVICE_URL,
+                },
+            ),
+            lambda r: r.status_code == 200 and r.json().get("success"),
+        )
+        if created is None:
+            return
+        id = created.json()["externalIdentifier"]
+
+        delivered = receiver.expect(id)
+        updated = await timed(
+            "update",
+            service.post(
+                f"/assessments/{id}/update",
+                data={"status": "completed", "score": str(index % 100)},
+            ),
+            lambda r: r.status_code == 303,
+        )
+        if updated is None:
+            return
+        start = time.perf_counter()
+        try:
+            body, signature = await asyncio.wait_for(delivered, delivery_timeout)
+        except asyncio.TimeoutError:
+            failures["webhook_delivery"] += 1
+            return
+        latencies["webhook_delivery"].append(time.perf_counter() - start)
+
+        # Pinpoint wraps the received payload as a JSON string under "body" and
+        # forwards the signature header along with the tenant's configuration
+        await timed(
+            "webhook",
+            provider.post(
+                "/webhook",
+                json={"body": body.decode("utf-8")},
+                headers={"X-Verify": signature, "x_example_assessments_key": API_KEY},
+            ),
+            lambda r: r.status_code == 200 and r.json().get("success"),
+        )
+
+    queue = asyncio.Queue()
+    for index in range(flows):
+        queue.put_nowait(index)
+
+    async def user():
+        while not queue.empty():
+            await flow(queue.get_nowait())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    await provider.aclose()
+    await service.aclose()
+    return elapsed, summarise(latencies, failures, elapsed)
+
+
+async def run(provider_url, args):
+    receiver = WebhookReceiver()
+    webhook_url = await receiver.start(args.receiver_port)
+    try:
+        return await drive(
+            provider_url,
+            receiver,
+            webhook_url,
+            args.flows,
+            args.concurrency,
+            args.delivery_timeout,
+        )
+    finally:
+        await receiver.stop()
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_steps(steps, baseline=None):
+    print(
+        f"{'step':<18} {'count':>6} {'fail':>5} {'rps':>8} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for step, result in steps.items():
+        line = (
+            f"{step:<18} {result['count']:>6} {result['failures']:>5} "
+            f"{result['throughput_rps']:>8.1f} {result['p50_ms']:>8.1f} "
+            f"{result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f}"
+        )
+        previous = (baseline or {}).get(step)
+        if previous and previous["p95_ms"]:
+            change = (result["p95_ms"] - previous["p95_ms"]) / previous["p95_ms"] * 100
+            line += f"   p95 {change:+.0f}%"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flows", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--provider-port", type=int, default=8000)
+    parser.add_argument("--receiver-port", type=int, default=8002)
+    parser.add_argument(
+        "--workers", type=int, default=1, help="uvicorn workers per service"
+    )
+    parser.add_argument("--delivery-timeout", type=float, default=30.0)
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument(
+        "--compare", help="Earlier results file to compare p95 latency against"
+    )
+    args = parser.parse_args()
+
+    with scratch_directory() as directory:
+        with run_server(
+            "assessment_service", 8001, directory, args.workers
+        ), run_server(
+            "provider", args.provider_port, directory, args.workers
+        ) as provider_url:
+            elapsed, steps = asyncio.run(run(provider_url, args))
+
+    result = {
+        "benchmark": "workflow",
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "flows": args.flows,
+        "concurrency": args.concurrency,
+        "workers": args.workers,
+        "elapsed_s": elapsed,
+        "flows_per_s": args.flows / elapsed,
+        "steps": steps,
+    }
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["steps"]
+
+    print(f"{args.flows} flows in {elapsed:.2f}s ({result['flows_per_s']:.1f} flows/s)")
+    print_steps(steps, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(result, file, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Async TTL cache with stale-while-revalidate and single-flight loading
+
+    A fresh entry is returned as is. Once it is older than ``ttl`` but younger
+    than ``ttl + stale_ttl`` the stale value is returned immediately while one
+    background refresh runs. Beyond that callers wait for a reload. Concurrent
+    misses for the same key share a single loader call, and if the loader fails
+    the last good value is returned whatever its age, unless the error is one
+    of ``invalidate_on``: those drop the entry and always reach the caller.
+
+    Args:
+        ttl (float): Seconds an entry is considered fresh
+        stale_ttl (float): Further seconds a stale entry may be served while refreshing
+        max_entries (int): Maximum number of keys kept, evicting least recently used
+        invalidate_on (tuple[type]): Loader errors meaning the cached value must
+            no longer be served, e.g. a revoked credential
+    """
+
+    def __init__(self, ttl, stale_ttl=0.0, max_entries=1024, invalidate_on=()):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.invalidate_on = tuple(invalidate_on)
+        self._entries = OrderedDict()
+        self._inflight = {}
+
+    async def get(self, key, loader):
+        """
+        Return the cached value for ``key``, calling ``loader`` when it needs refreshing
+
+        Args:
+            key (hashable): Cache key
+            loader (callable): Zero-argument coroutine function producing a fresh value
+
+        Returns:
+            object: The cached or freshly loaded value
+
+        Raises:
+            Exception: Whatever ``loader`` raised, if there is no previous value to
+                fall back to or the error is one of ``invalidate_on``
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self._refresh(key, loader)
+                return entry[1]
+
+        try:
+            return await asyncio.shield(self._refresh(key, loader))
+        except self.invalidate_on:
+            raise
+        except Exception:
+            if entry is not None:
+                return entry[1]
+            raise
+
+    def peek(self, key):
+        """Return the last good value for ``key`` regardless of age, or None"""
+        entry = self._entries.get(key)
+        return entry[1] if entry is not None else None
+
+    def invalidate(self, key=None):
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def _refresh(self, key, loader):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._load(key, loader))
+            # Background refreshes may have no awaiter; mark their errors as handled
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+        return task
+
+    async def _load(self, key, loader):
+        try:
+            value = await loader()
+        except Exception as e:
+            logger.warning("Cache refresh failed: %s", e)
+            if isinstance(e, self.invalidate_on):
+                self._entries.pop(key, None)
+            raise
+        finally:
+            self._inflight.pop(key, None)
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return value
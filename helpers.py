@@ -1,4 +1,12 @@
 import base64
+import mimetypes
+import mmap
+import os
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from storage import AssessmentStore
+
+_assessment_store = None
 
 
 def svg_to_base64(svg_string):
@@ -21,6 +29,151 @@ def svg_to_base64(svg_string):
     return f"data:image/svg+xml;base64,{base64_svg}"
 
 
+# Encoded data URIs are cached up to this many bytes in total
+ASSET_CACHE_MAX_BYTES = 16 * 1024 * 1024
+# Files at least this large are read through mmap instead of a full read()
+ASSET_MMAP_THRESHOLD = 1024 * 1024
+
+ASSET_MIME_TYPES = {
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+}
+
+
+class EncodedAsset(NamedTuple):
+    """Result of encoding a file as a data URI; ``data_uri`` is None on ``error``"""
+
+    data_uri: Optional[str]
+    error: Optional[str] = None
+
+    @property
+    def ok(self):
+        return self.error is None
+
+
+class AssetCache:
+    """
+    LRU cache of base64 data URIs keyed by file path, mtime and size
+
+    A changed file gets a new key, so stale entries simply age out. Entries are
+    evicted least recently used first once the cached data URIs exceed
+    ``max_bytes``.
+
+    Args:
+        max_bytes (int): Total size budget for cached data URIs
+        mmap_threshold (int): File size from which reads go through mmap
+    """
+
+    def __init__(
+        self, max_bytes=ASSET_CACHE_MAX_BYTES, mmap_threshold=ASSET_MMAP_THRESHOLD
+    ):
+        self.max_bytes = max_bytes
+        self.mmap_threshold = mmap_threshold
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def encode(self, file_path, mime_type=None):
+        """
+        Convert a file to a base64 data URI, reusing the cached copy when unchanged
+
+        Args:
+            file_path (str): Path to the file
+            mime_type (str): MIME type for the data URI; detected from the
+                extension if omitted
+
+        Returns:
+            EncodedAsset: The data URI, or the reason it could not be produced
+        """
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return EncodedAsset(None, "File not found")
+        except OSError as e:
+            return EncodedAsset(None, str(e))
+
+        mime_type = mime_type or guess_mime_type(file_path)
+        if mime_type is None:
+            return EncodedAsset(None, f"Unknown MIME type for {file_path}")
+
+        key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, mime_type)
+        data_uri = self._entries.get(key)
+        if data_uri is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return EncodedAsset(data_uri)
+
+        self.misses += 1
+        try:
+            data_uri = (
+                f"data:{mime_type};base64,{self._read_base64(file_path, stat.st_size)}"
+            )
+        except OSError as e:
+            return EncodedAsset(None, str(e))
+        self._store(key, data_uri)
+        return EncodedAsset(data_uri)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self.size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def _read_base64(self, file_path, size):
+        with open(file_path, "rb") as file:
+            if size >= self.mmap_threshold:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    return base64.b64encode(mapped).decode("ascii")
+            return base64.b64encode(file.read()).decode("ascii")
+
+    def _store(self, key, data_uri):
+        size = len(data_uri)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = data_uri
+        self.size += size
+        while self.size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.size -= len(evicted)
+            self.evictions += 1
+
+
+asset_cache = AssetCache()
+
+
+def guess_mime_type(file_path):
+    extension = os.path.splitext(file_path)[1].lower()
+    return ASSET_MIME_TYPES.get(extension) or mimetypes.guess_type(file_path)[0]
+
+
+def encode_asset(file_path, mime_type=None):
+    """
+    Convert a file to a base64 data URI through the shared asset cache
+
+    Args:
+        file_path (str): Path to the file
+        mime_type (str): MIME type for the data URI; detected from the extension
+            if omitted
+
+    Returns:
+        EncodedAsset: The data URI, or the reason it could not be produced
+    """
+    return asset_cache.encode(file_path, mime_type)
+
+
 def svg_file_to_base64(svg_file_path):
     """
     Convert SVG file to base64 encoded string
@@ -29,23 +182,9 @@ def svg_file_to_base64(svg_file_path):
         svg_file_path (str): Path to the SVG file
 
     Returns:
-        str: Base64 encoded SVG with data URI prefix
+        str | None: Base64 encoded SVG with data URI prefix, or None if unreadable
     """
-    try:
-        # Read the SVG file
-        with open(svg_file_path, "rb") as file:
-            # Read binary data
-            svg_data = file.read()
-
-            # Encode to base64
-            base64_svg = base64.b64encode(svg_data).decode("utf-8")
-
-            # Return with data URI prefix
-            return f"data:image/svg+xml;base64,{base64_svg}"
-    except FileNotFoundError:
-        return "Error: File not found"
-    except Exception as e:
-        return f"Error: {str(e)}"
+    return encode_asset(svg_file_path, "image/svg+xml").data_uri
 
 
 def png_to_base64(png_file_path):
@@ -56,23 +195,9 @@ def png_to_base64(png_file_path):
         png_file_path (str): Path to the PNG file
 
     Returns:
-        str: Base64 encoded PNG with data URI prefix
+        str | None: Base64 encoded PNG with data URI prefix, or None if unreadable
     """
-    try:
-        # Read the PNG file in binary mode
-        with open(png_file_path, "rb") as image_file:
-            # Read the binary data
-            binary_data = image_file.read()
-
-            # Encode to base64
-            base64_data = base64.b64encode(binary_data).decode("utf-8")
-
-            # Return with data URI prefix
-            return f"data:image/png;base64,{base64_data}"
-    except FileNotFoundError:
-        return "Error: File not found"
-    except Exception as e:
-        return f"Error: {str(e)}"
+    return encode_asset(png_file_path, "image/png").data_uri
 
 
 def jpg_to_base64(jpg_file_path):
@@ -83,23 +208,9 @@ def jpg_to_base64(jpg_file_path):
         jpg_file_path (str): Path to the JPG/JPEG file
 
     Returns:
-        str: Base64 encoded JPG with data URI prefix
+        str | None: Base64 encoded JPG with data URI prefix, or None if unreadable
     """
-    try:
-        # Read the JPG file in binary mode
-        with open(jpg_file_path, "rb") as image_file:
-            # Read the binary data
-            binary_data = image_file.read()
-
-            # Encode to base64
-            base64_data = base64.b64encode(binary_data).decode("utf-8")
-
-            # Return with data URI prefix
-            return f"data:image/jpeg;base64,{base64_data}"
-    except FileNotFoundError:
-        return "Error: File not found"
-    except Exception as e:
-        return f"Error: {str(e)}"
+    return encode_asset(jpg_file_path, "image/jpeg").data_uri
 
 
 def get_field_value(data, field_key):
@@ -116,28 +227,119 @@ def get_configuration_value(data, field_key):
     return None
 
 
-def get_assessment_database():
-    import json
+class ParsedForm:
+    """
+    Pinpoint form submission indexed by field and configuration key
+
+    Built once per request so each lookup is a dict access instead of a scan
+    of ``formFields``/``configurationValues``. When a key repeats, the first
+    occurrence wins, as with ``get_field_value``.
+
+    Args:
+        data (dict): The JSON form submission
+    """
+
+    def __init__(self, data):
+        self.data = data
+        # Built from the reversed lists so the first occurrence overwrites later ones
+        self.fields = {
+            field["key"]: field.get("value")
+            for field in reversed(data.get("formFields") or [])
+        }
+        self.configuration = {
+            config["key"]: config.get("value")
+            for config in reversed(data.get("configurationValues") or [])
+        }
+
+    def field(self, key):
+        return self.fields.get(key)
+
+    def config(self, key):
+        return self.configuration.get(key)
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+
+def get_assessment_store():
+    """
+    Return the shared assessment store, loading it on first use
+
+    Returns:
+        AssessmentStore: Journal-backed store indexed by assessment id
+    """
+    global _assessment_store
+    if _assessment_store is None:
+        _assessment_store = AssessmentStore()
+    return _assessment_store
+
 
+def get_assessment_database():
     try:
-        with open("assessments_database.json", "r") as file:
-            return json.load(file)
-    except FileNotFoundError:
-        return []
-    except json.JSONDecodeError:
-        return []
+        return list(get_assessment_store())
     except Exception as e:
         print(f"Error reading assessments database: {str(e)}")
         return []
 
 
-def write_assessments_database(assessments):
-    import json
+def write_assessment(assessment):
+    """
+    Persist a single new or changed assessment without rewriting the others
+
+    Args:
+        assessment (dict): The assessment record to write
+
+    Returns:
+        bool: True if the record was written
+    """
+    try:
+        get_assessment_store().put(assessment)
+        return True
+    except Exception as e:
+        print(f"Error writing assessment {assessment.get('id')}: {str(e)}")
+        return False
+
+
+def write_assessments(assessments):
+    """
+    Persist a batch of new or changed assessments in a single write
 
+    Args:
+        assessments (list[dict]): The assessment records to write
+
+    Returns:
+        bool: True if the records were written
+    """
+    try:
+        get_assessment_store().put_many(assessments)
+        return True
+    except Exception as e:
+        print(f"Error writing {len(assessments)} assessments: {str(e)}")
+        return False
+
+
+def insert_assessments(assessments):
+    """
+    Persist new assessments in a single write, skipping ids that already exist
+
+    Args:
+        assessments (list[dict]): The assessment records to insert
+
+    Returns:
+        dict | None: The existing record for every skipped id, keyed by id, or
+        None if the write failed
+    """
+    try:
+        return get_assessment_store().insert_many(assessments)
+    except Exception as e:
+        print(f"Error inserting {len(assessments)} assessments: {str(e)}")
+        return None
+
+
+def write_assessments_database(assessments):
     try:
-        with open("assessments_database.json", "w") as file:
-            json.dump(assessments, file, indent=4)
-            return True
+        get_assessment_store().replace_all(assessments)
+        return True
     except Exception as e:
         print(f"Error writing assessments database: {str(e)}")
 
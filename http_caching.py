@@ -0,0 +1,171 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from email.utils import formatdate, parsedate_to_datetime
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if params.startswith("q="):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                pass
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class CachedPayload:
+    """
+    Pre-serialised response body with a strong ETag and pre-compressed variants
+
+    The body is hashed and compressed once, so serving it again is a header
+    comparison and a bytes copy. Each encoding gets its own strong ETag
+    (``"<hash>"``, ``"<hash>-gzip"``, ``"<hash>-br"``) and any of them satisfies
+    ``If-None-Match``. With ``last_modified`` set, ``If-Modified-Since`` is
+    honoured too when the request carries no ``If-None-Match``.
+
+    Args:
+        body (bytes): The serialised response body
+        media_type (str): Content type of the body
+        headers (dict): Extra headers sent with every response
+        last_modified (float): Unix time the content last changed, sent as
+            ``Last-Modified``
+    """
+
+    def __init__(
+        self, body, media_type="application/json", headers=None, last_modified=None
+    ):
+        self.body = body
+        self.media_type = media_type
+        self.headers = dict(headers or {})
+        # HTTP dates have one second resolution
+        self.last_modified = int(last_modified) if last_modified is not None else None
+        if self.last_modified is not None:
+            self.headers["Last-Modified"] = formatdate(self.last_modified, usegmt=True)
+        self.digest = hashlib.sha256(body).hexdigest()[:32]
+        self.variants = {None: body}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants["gzip"] = gzip.compress(body, GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+    def etag(self, encoding=None):
+        return f'"{self.digest}-{encoding}"' if encoding else f'"{self.digest}"'
+
+    def is_not_modified(self, request: Request):
+        if_none_match = request.headers.get("if-none-match")
+        if not if_none_match:
+            return self._not_modified_since(request.headers.get("if-modified-since"))
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag.strip('"').split("-")[0] == self.digest:
+                return True
+        return False
+
+    def _not_modified_since(self, if_modified_since):
+        if not if_modified_since or self.last_modified is None:
+            return False
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return self.last_modified <= since
+
+    def negotiate(self, request: Request):
+        accepted = _accepted_encodings(request.headers.get("accept-encoding", ""))
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return None
+
+    def response(self, request: Request, status_code=200):
+        """
+        Build the response for ``request``, honouring If-None-Match and Accept-Encoding
+
+        Args:
+            request (Request): The incoming request
+            status_code (int): Status code for a full response
+
+        Returns:
+            Response: A 304 if the client copy is current, otherwise the best
+            encoded body
+        """
+        encoding = self.negotiate(request)
+        headers = {
+            **self.headers,
+            "ETag": self.etag(encoding),
+            "Vary": "Accept-Encoding",
+        }
+        if self.is_not_modified(request):
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        return Response(
+            content=self.variants[encoding],
+            status_code=status_code,
+            media_type=self.media_type,
+            headers=headers,
+        )
+
+
+class PageCache:
+    """
+    Least recently used cache of rendered pages, one version per key
+
+    A page is only served while the version it was rendered for matches, so a
+    changed record misses even in a process that never saw the change.
+
+    Args:
+        max_entries (int): Maximum number of pages kept
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+
+    def get(self, key, version):
+        """
+        Return the cached page for ``key`` if it was rendered for ``version``
+
+        Args:
+            key (Hashable): The page key, e.g. an assessment id
+            version (Hashable): Whatever the page was rendered from
+
+        Returns:
+            CachedPayload | None: The cached page
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key, version, payload):
+        self._entries[key] = (version, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        self._entries.pop(key, None)
@@ -0,0 +1,184 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+IDEMPOTENCY_HEADER = "idempotency-key"
+# Explicit Idempotency-Key headers are honoured for a day; keys derived from a
+# payload hash only cover client retries, so they expire much sooner
+IDEMPOTENCY_KEY_TTL = 24 * 3600
+PAYLOAD_HASH_TTL = 600
+MAX_ENTRIES = 10000
+# The SQLite store prunes expired and excess rows once every this many writes
+PRUNE_EVERY = 100
+
+
+def idempotency_key(headers, body, scope=""):
+    """
+    Derive the idempotency key for a request
+
+    Args:
+        headers (Mapping): The request headers
+        body (bytes): The raw request body
+        scope (str): Tenant identifier mixed into the key so tenants never collide
+
+    Returns:
+        tuple[str, float]: The key and how long a stored result stays valid, in seconds
+    """
+    header_key = headers.get(IDEMPOTENCY_HEADER)
+    if header_key:
+        material, ttl = f"key:{header_key}", IDEMPOTENCY_KEY_TTL
+    else:
+        try:
+            # Canonicalise so key order and whitespace differences still match
+            canonical = json.dumps(
+                json.loads(body), sort_keys=True, separators=(",", ":")
+            )
+        except ValueError:
+            canonical = body.decode("utf-8", "replace")
+        material, ttl = f"body:{canonical}", PAYLOAD_HASH_TTL
+    digest = hashlib.sha256(f"{scope}\n{material}".encode("utf-8")).hexdigest()
+    return digest, ttl
+
+
+class IdempotencyCache:
+    """
+    Bounded, TTL-expiring store of response bodies keyed by idempotency key
+
+    ``lock`` serialises concurrent requests with the same key, so a retry that
+    arrives while the original is still running waits for and replays its result
+    instead of calling upstream a second time.
+
+    Args:
+        max_entries (int): Maximum number of stored results, evicting least
+            recently used
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._locks = {}
+
+    def get(self, key):
+        """
+        Return the stored response body for ``key`` if it has not expired
+
+        Args:
+            key (str): The idempotency key
+
+        Returns:
+            bytes | None: The stored body
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, body = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return body
+
+    def set(self, key, body, ttl):
+        """
+        Store the response body for ``key``
+
+        Args:
+            key (str): The idempotency key
+            body (bytes): The serialised response body
+            ttl (float): Seconds the body stays valid
+        """
+        self._entries[key] = (time.time() + ttl, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @asynccontextmanager
+    async def lock(self, key):
+        """Hold the per-key lock; the lock is dropped once nobody is waiting on it"""
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+
+class SQLiteIdempotencyCache(IdempotencyCache):
+    """
+    Idempotency cache persisted in SQLite so stored results survive restarts
+
+    Args:
+        path (str): Path to the SQLite database
+        max_entries (int): Maximum number of stored results, evicting the oldest
+            in batches
+    """
+
+    def __init__(self, path, max_entries=MAX_ENTRIES):
+        super().__init__(max_entries)
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS idempotency (
+                key TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                expires_at REAL NOT NULL,
+                created_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idempotency_created ON idempotency (created_at)"
+        )
+        self._db.execute(
+            "DELETE FROM idempotency WHERE expires_at <= ?", (time.time(),)
+        )
+        self._db.commit()
+
+    def get(self, key):
+        row = self._db.execute(
+            "SELECT body FROM idempotency WHERE key = ? AND expires_at > ?",
+            (key, time.time()),
+        ).fetchone()
+        return row[0] if row is not None else None
+
+    def set(self, key, body, ttl):
+        now = time.time()
+        self._db.execute(
+            "INSERT OR REPLACE INTO idempotency (key, body, expires_at, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            (key, body, now + ttl, now),
+        )
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self._db.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,))
+            self._db.execute(
+                "DELETE FROM idempotency WHERE key IN ("
+                "SELECT key FROM idempotency ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+        self._db.commit()
+
+
+def create_idempotency_cache(path=None, max_entries=MAX_ENTRIES):
+    """
+    Create an idempotency cache, in memory or backed by SQLite
+
+    Args:
+        path (str): SQLite database path; None keeps results in memory only
+        max_entries (int): Maximum number of stored results
+
+    Returns:
+        IdempotencyCache: The cache
+    """
+    if path is None:
+        return IdempotencyCache(max_entries)
+    return SQLiteIdempotencyCache(path, max_entries)
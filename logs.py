@@ -0,0 +1,166 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+QUEUE_SIZE = 10000
+REDACTED = "[REDACTED]"
+
+# Matched case-insensitively with "-" treated as "_", so both header spellings hit
+SENSITIVE_KEYS = {
+    "apikey",
+    "api_key",
+    "authorization",
+    "cookie",
+    "password",
+    "secret",
+    "token",
+    "x_verify",
+    "x_example_assessments_key",
+}
+
+_listener = None
+
+
+def _normalise(key):
+    return str(key).lower().replace("-", "_")
+
+
+def register_sensitive_keys(*keys):
+    """
+    Add keys whose values are always redacted from log fields
+
+    Args:
+        *keys (str): Field names or header names, e.g. config fields flagged
+            ``sensitive``
+    """
+    SENSITIVE_KEYS.update(_normalise(key) for key in keys if key)
+
+
+def redact(value):
+    """
+    Return a copy of ``value`` with every sensitive field replaced
+
+    Handles plain mappings as well as Pinpoint's ``[{"key": ..., "value": ...}]``
+    lists, where the sensitivity comes from the ``key`` entry.
+
+    Args:
+        value: Any JSON-like value
+
+    Returns:
+        The value with sensitive entries replaced by ``[REDACTED]``
+    """
+    if isinstance(value, dict):
+        if (
+            "key" in value
+            and "value" in value
+            and _normalise(value["key"]) in SENSITIVE_KEYS
+        ):
+            return {**value, "value": REDACTED}
+        return {
+            key: REDACTED if _normalise(key) in SENSITIVE_KEYS else redact(item)
+            for key, item in value.items()
+        }
+    if isinstance(value, (list, tuple)):
+        return [redact(item) for item in value]
+    return value
+
+
+def fields(sample_rate=1.0, **values):
+    """
+    Build the ``extra`` argument for a structured log call
+
+    Values are only redacted and serialised if the record is actually emitted,
+    and the work happens on the logging thread rather than in the request.
+
+    Args:
+        sample_rate (float): Fraction of these records to keep, for high-volume routes
+        **values: Structured fields to attach to the record
+
+    Returns:
+        dict: Pass as ``extra=`` to a logger call
+    """
+    return {"fields": values, "sample_rate": sample_rate}
+
+
+class SamplingFilter(logging.Filter):
+    """Drop a share of records with a ``sample_rate`` below 1; warnings are always kept"""
+
+    def filter(self, record):
+        rate = getattr(record, "sample_rate", 1.0)
+        return (
+            rate >= 1.0 or record.levelno >= logging.WARNING or random.random() < rate
+        )
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as one JSON object per line with redacted structured fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+            + f".{int(record.msecs):03d}",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        values = getattr(record, "fields", None)
+        if values:
+            entry.update(redact(values))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Queue handler that never blocks or formats in the calling thread
+
+    The stock ``QueueHandler.prepare`` formats the message before enqueuing;
+    here the record is queued as is and formatted by the listener thread. When
+    the queue is full the record is dropped and counted instead of waiting.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def configure_logging(level=logging.INFO, stream=None, queue_size=QUEUE_SIZE):
+    """
+    Route all logging through a bounded queue to a JSON lines stream handler
+
+    Safe to call more than once; later calls only change the level.
+
+    Args:
+        level (int): Root log level
+        stream: Output stream, stderr by default
+        queue_size (int): Records buffered before new ones are dropped
+    """
+    global _listener
+    root = logging.getLogger()
+    root.setLevel(level)
+    if _listener is not None:
+        return
+    log_queue = queue.Queue(queue_size)
+    handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter())
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JSONFormatter())
+    root.handlers = [handler]
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
@@ -0,0 +1,306 @@
+import time
+from bisect import bisect_left
+
+import httpx
+from fastapi import Response
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds; requests, upstream calls and disk writes all land
+# somewhere between a tenth of a millisecond and ten seconds
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic counter, one value per combination of label values
+
+    Args:
+        name (str): Metric name
+        help (str): One-line description shown in the exposition
+        labelnames (tuple[str]): Label names, in the order values are passed
+    """
+
+    type = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+
+    def inc(self, *labels, amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        for labels, value in self._values.items():
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down, such as the number of requests in flight"""
+
+    type = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels, value):
+        self._values[labels] = value
+
+
+class Histogram:
+    """
+    Bucketed distribution of observed values with their sum and count
+
+    Args:
+        name (str): Metric name
+        help (str): One-line description shown in the exposition
+        labelnames (tuple[str]): Label names, in the order values are passed
+        buckets (tuple[float]): Sorted bucket upper bounds
+    """
+
+    type = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._values = {}
+
+    def observe(self, value, *labels):
+        entry = self._values.get(labels)
+        if entry is None:
+            # Per-bucket counts plus the +Inf bucket, then sum; cumulative on render
+            entry = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+
+    def samples(self):
+        bounds = self.buckets + (float("inf"),)
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield (
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} "
+                    f"{cumulative}"
+                )
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total!r}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def gauge(self, name, help, labelnames=()):
+        return self._register(Gauge(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        """
+        Render every metric in the Prometheus text exposition format
+
+        Returns:
+            bytes: The exposition body
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests handled", ("method", "route", "status")
+)
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds",
+    "Time spent handling HTTP requests",
+    ("method", "route"),
+)
+http_in_flight = registry.gauge(
+    "http_requests_in_flight", "HTTP requests being handled"
+)
+outbound_requests = registry.counter(
+    "outbound_requests_total", "Outbound HTTP requests", ("peer", "target", "status")
+)
+outbound_request_seconds = registry.histogram(
+    "outbound_request_duration_seconds",
+    "Time until response headers for outbound HTTP requests",
+    ("peer", "target"),
+)
+circuit_state = registry.gauge(
+    "upstream_circuit_state",
+    "Circuit breaker state: 0 closed, 1 half open, 2 open",
+    ("peer",),
+)
+circuit_rejections = registry.counter(
+    "upstream_circuit_rejections_total",
+    "Calls failed fast by an open circuit breaker",
+    ("peer",),
+)
+http_rejected = registry.counter(
+    "http_requests_rejected_total",
+    "Requests turned away by rate limiting or load shedding",
+    ("reason",),
+)
+db_operation_seconds = registry.histogram(
+    "db_operation_duration_seconds",
+    "Time spent on database reads and writes",
+    ("operation",),
+)
+db_bytes = registry.counter(
+    "db_bytes_total", "Bytes read from and written to the database", ("operation",)
+)
+
+
+def observe_db(operation, started, size=0):
+    """
+    Record one database read or write
+
+    Args:
+        operation (str): Operation name, e.g. ``append`` or ``read``
+        started (float): ``time.perf_counter()`` value taken when the operation started
+        size (int): Bytes read or written
+    """
+    db_operation_seconds.observe(time.perf_counter() - started, operation)
+    if size:
+        db_bytes.inc(operation, amount=size)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency and in-flight requests
+
+    Requests are labelled with the matched route template (``/assessments/{id}``)
+    rather than the raw path, so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_in_flight.dec()
+            # The router stores the matched route on the scope it was given
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_request_seconds.observe(elapsed, scope["method"], path)
+            http_requests.inc(scope["method"], path, str(status))
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    httpx transport that times each outbound request
+
+    Args:
+        peer (str): Name of the remote service, used as the ``peer`` label
+        target (str): ``path`` to label requests by URL path, or ``host`` for
+            callers such as webhooks whose paths are unbounded
+        transport (httpx.AsyncBaseTransport): The transport that sends the requests
+    """
+
+    def __init__(self, peer, target="path", transport=None, **kwargs):
+        self.peer = peer
+        self.target = target
+        self._transport = transport or httpx.AsyncHTTPTransport(**kwargs)
+
+    async def handle_async_request(self, request):
+        target = request.url.path if self.target == "path" else request.url.host
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self._transport.handle_async_request(request)
+            status = str(response.status_code)
+            return response
+        finally:
+            outbound_request_seconds.observe(
+                time.perf_counter() - started, self.peer, target
+            )
+            outbound_requests.inc(self.peer, target, status)
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+def install(app):
+    """
+    Add the metrics middleware and a ``/metrics`` endpoint to a FastAPI app
+
+    Args:
+        app (FastAPI): The application to instrument
+    """
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(content=registry.render(), media_type=CONTENT_TYPE)
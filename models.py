@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 
 
 class HelloResponse(BaseModel):
@@ -64,14 +64,14 @@ class FormField(BaseModel):
     key: str
     label: str
     type: str
-    required: Optional[bool]
-    readonly: Optional[bool]
-    includeValueInRefetch: Optional[bool]
-    placeholder: Optional[str]
-    value: Optional[str]
-    singleSelectOptions: Optional[List[SelectOption]]
-    intent: Optional[str]
-    description: Optional[str]
+    required: Optional[bool] = None
+    readonly: Optional[bool] = None
+    includeValueInRefetch: Optional[bool] = None
+    placeholder: Optional[str] = None
+    value: Optional[str] = None
+    singleSelectOptions: Optional[List[SelectOption]] = None
+    intent: Optional[str] = None
+    description: Optional[str] = None
 
 
 class ExportResponse(BaseModel):
@@ -122,6 +122,15 @@ class CreateAssessmentErrorResponse(BaseModel):
     toast: Toast
 
 
+class CreateAssessmentsResponse(BaseModel):
+    """Response model for /create_assessments endpoint"""
+
+    resultVersion: str
+    key: str
+    success: bool
+    results: List[Union[CreateAssessmentSuccessResponse, CreateAssessmentErrorResponse]]
+
+
 class AssessmentUpdate(BaseModel):
     """Assessment update object"""
 
@@ -1,268 +1,740 @@
-from fastapi import FastAPI, Request
-from helpers import svg_file_to_base64, png_to_base64, get_field_value
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, Request, Response
+from admission import APIKeyRateLimit
+from helpers import encode_asset, ParsedForm
 from models import (
     HelloResponse,
+    Action,
+    ActionMapping,
+    ConfigurationFormField,
     ConfigResponse,
+    FormField,
     ExportResponse,
+    Toast,
     CreateAssessmentSuccessResponse,
+    CreateAssessmentErrorResponse,
+    CreateAssessmentsResponse,
+    ExternalLink,
+    AssessmentUpdate,
     WebhookResponse,
 )
-import requests
+from responses import ModelResponse
+from signing import SIGNATURE_HEADER, WebhookVerifier
+from tenants import TenantClients, normalise_base_url
+from http_caching import CachedPayload
+from cache import TTLCache
+from idempotency import create_idempotency_cache, idempotency_key
+from logs import configure_logging, fields, register_sensitive_keys
+import admission
+import metrics
+import os
 import uuid
 import json
 import logging
 
-# Configure logging with timestamps
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    datefmt="%Y-%m-%d %H:%M:%S",
-)
+# JSON lines through a background queue; payloads are only logged at DEBUG
+configure_logging(logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI()
+# Share of routine INFO lines kept on the high-volume routes
+HOT_PATH_SAMPLE_RATE = 0.1
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One keep-alive pool, circuit breaker and rate limit per tenant base URL
+    app.state.tenants = TenantClients()
+    yield
+    await app.state.tenants.aclose()
+
+
+# Set to a file path, e.g. "ratelimit.sqlite3", to share rate limits between workers
+RATE_LIMIT_DB_PATH = None
+# Requests per second per tenant API key and route
+api_key_rate_limit = APIKeyRateLimit(
+    "x_example_assessments_key", path=RATE_LIMIT_DB_PATH
+)
+
+app = FastAPI(lifespan=lifespan, dependencies=[Depends(api_key_rate_limit)])
+# Installed first so the metrics middleware also counts shed requests
+admission.install(app)
+metrics.install(app)
 
-API_KEY = "ABCDEFG123456789"
 ASSESSMENT_REPORT_PATH = "http://localhost:8001/assessments/"
 
+# The config response only changes when one of these files does
+CONFIG_ASSETS = ("logo.png", "action-logo.svg")
+_config_cache = {}
+
+# Package listings per API key: fresh for PACKAGES_TTL seconds, then served
+# stale for up to PACKAGES_STALE_TTL more while a background refresh runs
+PACKAGES_TTL = 300
+PACKAGES_STALE_TTL = 3600
+# A rejected API key drops the cached listing instead of serving it
+package_cache = TTLCache(
+    ttl=PACKAGES_TTL, stale_ttl=PACKAGES_STALE_TTL, invalidate_on=(PermissionError,)
+)
+
+# Candidates per /create_assessments call; must not exceed the assessment
+# service's MAX_BULK_SIZE, since they are sent upstream in one request
+MAX_CANDIDATES = 1000
+
+# Set to a file path, e.g. "idempotency.sqlite3", to keep results across restarts
+IDEMPOTENCY_DB_PATH = None
+idempotency_cache = create_idempotency_cache(IDEMPOTENCY_DB_PATH)
+
+# Precomputed webhook signing keys per tenant
+webhook_verifier = WebhookVerifier()
+
 
 @app.get("/hello", responses={200: {"model": HelloResponse}})
 async def index():
 
-    return {"Message": "Hello, World!"}
+    return ModelResponse(HelloResponse(Message="Hello, World!"))
+
+
+@app.get("/upstream/status")
+async def upstream_status(request: Request):
+    """Report the open tenant pools and their circuit breaker state"""
+    return {"tenants": request.app.state.tenants.snapshot()}
 
 
 @app.post("/", responses={200: {"model": ConfigResponse}})
-async def config():
-    return {
-        "version": "1.0.0",
-        "name": "Sample FastAPI Assessment Service",
-        "logoBase64": png_to_base64("logo.png"),
-        "actions": [
-            {
-                "key": "createAssessment",
-                "label": "Send to ExampleAssessments",
-                "iconSvgBase64": svg_file_to_base64("action-logo.svg"),
-                "metaEndpoint": "/export",
-                "mappings": [
-                    {
-                        "key": "firstName",
-                        "label": "First Name",
-                        "value": "{{candidate_first_name}}",
-                    },
-                    {
-                        "key": "lastName",
-                        "label": "Last Name",
-                        "value": "{{candidate_last_name}}",
-                    },
+async def config(request: Request):
+    return get_config_payload().response(request)
+
+
+CONFIGURATION_FORM_FIELDS = [
+    ConfigurationFormField(
+        key="apiKey",
+        label="API Key",
+        required=True,
+        type="string",
+        sensitive=True,
+        useAsHttpHeader="X_EXAMPLE_ASSESSMENTS_KEY",
+    ),
+    ConfigurationFormField(
+        key="apiBaseURL",
+        label="Base URL",
+        description="Your Base URL for ExampleAssessments. Use `http://localhost:8001` if running the local assessment service.",
+        placeholder="http://localhost:8001",
+        required=True,
+        type="string",
+        useAsHttpHeader="X_EXAMPLE_BASE_URL",
+    ),
+    ConfigurationFormField(
+        key="previousApiKey",
+        label="Previous API Key",
+        description="While rotating API keys, enter the old key here so webhooks signed with it are still accepted.",
+        required=False,
+        type="string",
+        sensitive=True,
+        useAsHttpHeader="X_EXAMPLE_PREVIOUS_ASSESSMENTS_KEY",
+    ),
+]
+# Values of sensitive config fields, and the headers they travel in, are never logged
+register_sensitive_keys(
+    *(
+        name
+        for field in CONFIGURATION_FORM_FIELDS
+        if field.sensitive
+        for name in (field.key, field.useAsHttpHeader)
+    )
+)
+
+
+def _data_uri(path):
+    asset = encode_asset(path)
+    if not asset.ok:
+        logger.error("Could not encode %s: %s", path, asset.error)
+        return ""
+    return asset.data_uri
+
+
+def build_config():
+    return ConfigResponse(
+        version="1.0.0",
+        name="Sample FastAPI Assessment Service",
+        logoBase64=_data_uri("logo.png"),
+        actions=[
+            Action(
+                key="createAssessment",
+                label="Send to ExampleAssessments",
+                iconSvgBase64=_data_uri("action-logo.svg"),
+                metaEndpoint="/export",
+                mappings=[
+                    ActionMapping(
+                        key="firstName",
+                        label="First Name",
+                        value="{{candidate_first_name}}",
+                    ),
+                    ActionMapping(
+                        key="lastName",
+                        label="Last Name",
+                        value="{{candidate_last_name}}",
+                    ),
                 ],
-            }
-        ],
-        "webhookProcessEndpoint": "/webhook",
-        "webhookAuthenticationHeader": "X-Verify",
-        "configurationFormFields": [
-            {
-                "key": "apiKey",
-                "label": "API Key",
-                "required": True,
-                "type": "string",
-                "sensitive": True,
-                "useAsHttpHeader": "X_EXAMPLE_ASSESSMENTS_KEY",
-            },
-            {
-                "key": "apiBaseURL",
-                "label": "Base URL",
-                "description": "Your Base URL for ExampleAssessments. Use `http://localhost:8000` if running local FastAPI server.",
-                "placeholder": "http://localhost:8000",
-                "required": True,
-                "type": "string",
-                "useAsHttpHeader": "X_EXAMPLE_BASE_URL",
-            },
+            )
         ],
-    }
+        webhookProcessEndpoint="/webhook",
+        webhookAuthenticationHeader="X-Verify",
+        configurationFormFields=CONFIGURATION_FORM_FIELDS,
+    )
+
+
+def _asset_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def get_config_payload():
+    """
+    Return the serialised config response, rebuilding it only when an asset changes
+
+    Returns:
+        CachedPayload: The config body with its ETag and compressed variants
+    """
+    key = tuple(_asset_version(path) for path in CONFIG_ASSETS)
+    if _config_cache.get("key") != key:
+        body = build_config().model_dump_json(exclude_none=True).encode("utf-8")
+        _config_cache["key"] = key
+        _config_cache["payload"] = CachedPayload(body)
+    return _config_cache["payload"]
+
+
+def tenant_config(request, form=None):
+    """
+    Return the calling tenant's assessment service base URL and API key
+
+    Pinpoint sends the ``apiBaseURL`` and ``apiKey`` configuration values as
+    headers; submitted forms also carry them in ``configurationValues``.
+
+    Args:
+        request (Request): The incoming request
+        form (ParsedForm): The submitted form, if any
+
+    Returns:
+        tuple[str, str | None]: The normalised base URL and the API key
+
+    Raises:
+        ValueError: If the configured base URL is not an http(s) URL
+    """
+    base_url = request.headers.get("x_example_base_url")
+    api_key = request.headers.get("x_example_assessments_key")
+    if form is not None:
+        base_url = base_url or form.config("apiBaseURL")
+        api_key = api_key or form.config("apiKey")
+    return normalise_base_url(base_url), api_key
+
+
+async def load_packages(tenants, base_url, api_key):
+    async with tenants.client(base_url) as client:
+        return await fetch_packages(client, api_key)
+
+
+async def fetch_packages(client, api_key):
+    """
+    Fetch the package catalogue from the assessment service as select options
+
+    Args:
+        client (httpx.AsyncClient): Client for the assessment service
+        api_key (str): API key to authenticate with
+
+    Returns:
+        list[dict]: Options with ``label`` and ``value`` keys
+
+    Raises:
+        PermissionError: If the assessment service rejected the API key
+    """
+    response = await client.get(
+        "/api/packages",
+        headers={"X_EXAMPLE_ASSESSMENTS_KEY": api_key},
+    )
+    if response.status_code in (401, 403):
+        raise PermissionError("API key rejected by the assessment service")
+    if response.status_code != 200:
+        raise Exception(
+            f"Failed to fetch packages: {response.status_code} {response.text}"
+        )
+    return [{"label": name, "value": str(id)} for id, name in response.json().items()]
 
 
 @app.post("/export", responses={200: {"model": ExportResponse}})
 async def export(request: Request):
-    headers = dict(request.headers)
-    api_key = headers.get("x_example_assessments_key")
-    logger.info(headers)
-    logger.info(f"API Key: {headers.get('x_example_assessments_key')}")
-    # Extract configuration values
-
-    if api_key != API_KEY or not api_key:
-        return {
-            "actionVersion": "1.0.0",
-            "key": "createAssessment",
-            "label": "Send to ExampleAssessments",
-            "description": "Sends a candidate to the internal ExampleAssessments system",
-            "formFields": [
-                {
-                    "key": "apiKeyCallout",
-                    "label": "No API Key",
-                    "type": "callout",
-                    "intent": "danger",
-                    "description": "No valid API Key provided in configuration. Please update the configuration with a valid API Key.",
-                }
-            ],
-            "submitEndpoint": "/create_assessment",
-        }
+    try:
+        base_url, api_key = tenant_config(request)
+    except ValueError:
+        base_url, api_key = None, None
+    logger.info(
+        "Export called",
+        extra=fields(
+            HOT_PATH_SAMPLE_RATE, base_url=base_url, has_api_key=bool(api_key)
+        ),
+    )
 
     try:
-        packages = requests.get(
-            "http://localhost:8001/api/packages",
-            headers={"X_EXAMPLE_ASSESSMENTS_KEY": api_key},
+        if not api_key or base_url is None:
+            raise PermissionError("No API key or base URL configured")
+        packages = await package_cache.get(
+            (base_url, api_key),
+            lambda: load_packages(request.app.state.tenants, base_url, api_key),
         )
-        if packages.status_code != 200:
-            raise Exception(
-                f"Failed to fetch packages: {packages.status_code} {packages.text}"
+    except PermissionError:
+        return ModelResponse(
+            ExportResponse(
+                actionVersion="1.0.0",
+                key="createAssessment",
+                label="Send to ExampleAssessments",
+                description="Sends a candidate to the internal ExampleAssessments system",
+                formFields=[
+                    FormField(
+                        key="apiKeyCallout",
+                        label="No API Key",
+                        type="callout",
+                        intent="danger",
+                        description="No valid API Key provided in configuration. Please update the configuration with a valid API Key.",
+                    )
+                ],
+                submitEndpoint="/create_assessment",
             )
-        else:
-            packages = packages.json()
-            packages = [
-                {"label": name, "value": str(id)} for id, name in packages.items()
-            ]
+        )
     except Exception as e:
-        logger.error(f"Error fetching packages: {str(e)}")
+        # Only reached with nothing cached; a stale package list is served otherwise
+        logger.error("Error fetching packages: %s", e)
+        return ModelResponse(
+            ExportResponse(
+                actionVersion="1.0.0",
+                key="createAssessment",
+                label="Send to ExampleAssessments",
+                description="Sends a candidate to the internal ExampleAssessments system",
+                formFields=[
+                    FormField(
+                        key="unavailableCallout",
+                        label="ExampleAssessments Unavailable",
+                        type="callout",
+                        intent="warning",
+                        description="The list of tests could not be loaded because ExampleAssessments is not responding. Please try again in a few minutes.",
+                    )
+                ],
+                submitEndpoint="/create_assessment",
+            )
+        )
+
+    return ModelResponse(
+        ExportResponse(
+            actionVersion="1.0.0",
+            key="createAssessment",
+            label="Send to ExampleAssessments",
+            description="Sends a candidate to the internal ExampleAssessments system",
+            formFields=[
+                FormField(
+                    key="selectedTest",
+                    label="Selected Test",
+                    placeholder="Select test...",
+                    type="string",
+                    required=True,
+                    value="",
+                    singleSelectOptions=packages,
+                ),
+                FormField(
+                    key="firstName",
+                    label="First Name",
+                    type="string",
+                    required=True,
+                    readonly=False,
+                    includeValueInRefetch=True,
+                ),
+                FormField(
+                    key="lastName",
+                    label="Last Name",
+                    type="string",
+                    required=True,
+                    readonly=False,
+                ),
+                FormField(
+                    key="email",
+                    label="Email",
+                    type="string",
+                    required=True,
+                    readonly=False,
+                ),
+            ],
+            submitEndpoint="/create_assessment",
+        )
+    )
+
 
+def build_assessment_payload(form):
+    """
+    Map a submitted Pinpoint form onto an assessment service payload
+
+    Args:
+        form (ParsedForm): The form submission from Pinpoint
+
+    Returns:
+        dict: Payload for the assessment service with a newly generated id
+    """
     return {
-        "actionVersion": "1.0.0",
-        "key": "createAssessment",
-        "label": "Send to ExampleAssessments",
-        "description": "Sends a candidate to the internal ExampleAssessments system",
-        "formFields": [
-            {
-                "key": "selectedTest",
-                "label": "Selected Test",
-                "placeholder": "Select test...",
-                "type": "string",
-                "required": True,
-                "value": "",
-                "singleSelectOptions": packages,
-            },
-            {
-                "key": "firstName",
-                "label": "First Name",
-                "type": "string",
-                "required": True,
-                "readonly": False,
-                "includeValueInRefetch": True,
-            },
-            {
-                "key": "lastName",
-                "label": "Last Name",
-                "type": "string",
-                "required": True,
-                "readonly": False,
-            },
-            {
-                "key": "email",
-                "label": "Email",
-                "type": "string",
-                "required": True,
-                "readonly": False,
-            },
-        ],
-        "submitEndpoint": "/create_assessment",
+        "id": str(uuid.uuid4()),
+        "name": f"{form.field('firstName')} {form.field('lastName')}",
+        "email": form.field("email"),
+        "packageId": form.field("selectedTest"),
+        "webhookUrl": form.get("webhookUrl"),
+        "platformUrl": form.get("generatedUuidRedirectUrl"),
     }
 
 
+def assessment_created_result(form, assessment, api_base_url):
+    return CreateAssessmentSuccessResponse(
+        resultVersion="1.0.0",
+        key="createAssessment",
+        success=True,
+        assessmentName=assessment["name"],
+        message="\n".join(
+            [
+                f"{form.field('firstName')} was successfully sent to the example assessment plugin.",
+                f"Last name was {form.field('lastName')}.",
+                f"The external ID was {str(assessment['id'])}.",
+            ]
+        ),
+        status=assessment["status"],
+        externalIdentifier=str(assessment["id"]),
+        externalRecordUrl=f"{api_base_url}/api/{assessment['id']}",
+        externalLinks=[],
+    )
+
+
+def assessment_failed_result(error):
+    return CreateAssessmentErrorResponse(
+        resultVersion="1.0.0",
+        key="createAssessment",
+        success=False,
+        toast=Toast(error=error),
+    )
+
+
 @app.post(
     "/create_assessment", responses={200: {"model": CreateAssessmentSuccessResponse}}
 )
 async def create_assessment(request: Request):
-    logger.info("Create Assessment Called")
+    logger.info("Create assessment called", extra=fields(HOT_PATH_SAMPLE_RATE))
 
+    # Pinpoint retries after a timeout with the same body; replay the first
+    # successful result instead of creating a duplicate assessment
+    key, ttl = idempotency_key(
+        request.headers,
+        await request.body(),
+        scope="\n".join(
+            request.headers.get(name, "")
+            for name in ("x_example_base_url", "x_example_assessments_key")
+        ),
+    )
+    async with idempotency_cache.lock(key):
+        replay = idempotency_cache.get(key)
+        if replay is not None:
+            logger.info("Replaying stored create_assessment result")
+            return Response(
+                content=replay,
+                media_type="application/json",
+                headers={"Idempotent-Replayed": "true"},
+            )
+        result = await _create_assessment(request)
+        response = ModelResponse(result)
+        if result.success:
+            idempotency_cache.set(key, response.body, ttl)
+        return response
+
+
+async def _create_assessment(request: Request):
     form_data = await request.json()
-    logger.info(f"Form Data Received: {form_data}")
-    id = uuid.uuid4()
-    api_base_url = request.headers.get("x_example_base_url")
+    logger.debug("Form data received", extra=fields(form=form_data))
 
-    assessment_payload = {
-        "id": str(id),
-        "name": f"{get_field_value(form_data, 'firstName')} {get_field_value(form_data, 'lastName')}",
-        "email": get_field_value(form_data, "email"),
-        "packageId": get_field_value(form_data, "selectedTest"),
-        "webhookUrl": form_data.get("webhookUrl"),
-        "platformUrl": form_data.get("generatedUuidRedirectUrl"),
-    }
-    logger.info(f"Assessment Payload: {assessment_payload}")
+    form = ParsedForm(form_data)
+    assessment_payload = build_assessment_payload(form)
+    logger.debug("Assessment payload built", extra=fields(payload=assessment_payload))
 
     try:
-        response = requests.post(
-            "http://localhost:8001/api/assessments/",
-            json=assessment_payload,
-            headers={"X_EXAMPLE_ASSESSMENTS_KEY": API_KEY},
-        )
-        logger.info(f"STATUS: {response.status_code}")
-        if response.status_code != 200:
-            return {
-                "resultVersion": "1.0.0",
-                "key": "createAssessment",
-                "success": False,
-                "toast": {
-                    "error": "API Key was blank. Please check the configuration.",
-                },
-            }
+        api_base_url, api_key = tenant_config(request, form)
+        async with request.app.state.tenants.client(api_base_url) as client:
+            # Safe to retry: the payload carries a fresh id, so a repeat of a
+            # request that did go through is refused with 409 rather than duplicated
+            response = await client.post(
+                "/api/assessments/",
+                idempotent=True,
+                json=assessment_payload,
+                headers={"X_EXAMPLE_ASSESSMENTS_KEY": api_key or ""},
+            )
+        if response.status_code in (401, 403):
+            return assessment_failed_result(
+                "API Key was blank. Please check the configuration."
+            )
+        elif response.status_code == 409:
+            # Our own id, so an earlier attempt of this request created it
+            assessment = response.json()["assessment"]
+            logger.info(
+                "Assessment already created",
+                extra=fields(assessment_id=assessment["id"]),
+            )
+            return assessment_created_result(form, assessment, api_base_url)
+        elif response.status_code != 200:
+            logger.warning("Assessment service returned %s", response.status_code)
+            return assessment_failed_result(
+                f"ExampleAssessments returned an error ({response.status_code}). Please try again."
+            )
         else:
             assessment = response.json()
-            logger.info(f"Assessment created successfully: {assessment}")
-            return {
-                "resultVersion": "1.0.0",
-                "key": "createAssessment",
-                "success": True,
-                "assessmentName": assessment["name"],
-                "message": "\n".join(
-                    [
-                        f"{get_field_value(form_data, 'firstName')} was successfully sent to the example assessment plugin.",
-                        f"Last name was {get_field_value(form_data, 'lastName')}.",
-                        f"The external ID was {str(assessment['id'])}.",
-                    ]
-                ),
-                "status": assessment["status"],
-                "externalIdentifier": str(assessment["id"]),
-                "externalRecordUrl": f"{api_base_url}/api/{assessment['id']}",
-                "externalLinks": [],
-            }
+            logger.info(
+                "Assessment created",
+                extra=fields(HOT_PATH_SAMPLE_RATE, assessment_id=assessment["id"]),
+            )
+            return assessment_created_result(form, assessment, api_base_url)
     except Exception as e:
-        logger.error(f"Error creating assessment: {str(e)}")
-        return {
-            "status": "error",
-            "message": f"Error creating assessment: {str(e)}",
-        }
+        logger.error("Error creating assessment: %s", e)
+        return assessment_failed_result(f"Error creating assessment: {str(e)}")
 
 
-@app.post("/webhook", responses={200: {"model": WebhookResponse}})
-async def process_webhook(request: Request):
+@app.post("/create_assessments", responses={200: {"model": CreateAssessmentsResponse}})
+async def create_assessments(request: Request):
+    """
+    Create assessments for a whole shortlist of candidates in one upstream call
 
-    logger.info("Webhook Process Called")
-    request = await request.json()
-    body = json.loads(request["body"])
+    The body is ``{"candidates": [...]}`` where each entry has the same shape as a
+    ``/create_assessment`` submission; a bare list is accepted too. Results are
+    returned in the same order. A body that is not such a list, or holds more
+    than ``MAX_CANDIDATES`` entries, is rejected with 422.
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        return assessments_rejected("body is not valid JSON")
+    candidates = body.get("candidates") if isinstance(body, dict) else body
+    if not isinstance(candidates, list) or not all(
+        isinstance(candidate, dict) for candidate in candidates
+    ):
+        return assessments_rejected("candidates must be a list of objects")
+    if len(candidates) > MAX_CANDIDATES:
+        return assessments_rejected(
+            f"{len(candidates)} candidates, at most {MAX_CANDIDATES} are allowed"
+        )
+    logger.info("Create assessments called", extra=fields(candidates=len(candidates)))
+    if not candidates:
+        return ModelResponse(
+            CreateAssessmentsResponse(
+                resultVersion="1.0.0", key="createAssessment", success=True, results=[]
+            )
+        )
 
-    logger.info(f"Webhook Data Received: {body}")
+    forms = [ParsedForm(form_data) for form_data in candidates]
+    payloads = [build_assessment_payload(form) for form in forms]
+    api_base_url = request.headers.get("x_example_base_url")
+    try:
+        api_base_url, api_key = tenant_config(request, forms[0])
+        async with request.app.state.tenants.client(api_base_url) as client:
+            response = await client.post(
+                "/api/assessments/bulk",
+                idempotent=True,
+                json=payloads,
+                headers={"X_EXAMPLE_ASSESSMENTS_KEY": api_key or ""},
+            )
+        if response.status_code != 200:
+            raise Exception(f"{response.status_code} {response.text}")
+        results = response.json()["results"]
+    except Exception as e:
+        logger.error("Error creating assessments: %s", e)
+        results = [
+            {"success": False, "error": f"Error creating assessment: {str(e)}"}
+            for _ in candidates
+        ]
+    # An entry refused because its id exists was created by an earlier attempt
+    # of this request: the ids are generated fresh for every call
+    created = [
+        result["success"] or result.get("assessment", {}).get("id") == payload["id"]
+        for result, payload in zip(results, payloads)
+    ]
+
+    return ModelResponse(
+        CreateAssessmentsResponse(
+            resultVersion="1.0.0",
+            key="createAssessment",
+            success=all(created),
+            results=[
+                (
+                    assessment_created_result(form, result["assessment"], api_base_url)
+                    if was_created
+                    else assessment_failed_result(result["error"])
+                )
+                for form, result, was_created in zip(forms, results, created)
+            ],
+        )
+    )
 
-    # Process the webhook data as needed
-    # For example, you might want to update the assessment status based on the webhook event
 
-    return {
-        "resultVersion": "1.0.0",
-        "success": True,
-        "updateAssessments": [
-            {
-                "externalIdentifier": body.get("id"),
-                "status": body.get("status"),
-                "score": int(body.get("score")),
-                "shouldNotify": True,
-                "externalLinks": [
-                    {
-                        "key": "report",
-                        "label": "Report",
-                        "url": f"{ASSESSMENT_REPORT_PATH}{body.get("report_path")}",
-                    }
-                ],
-            }
+def assessments_rejected(reason):
+    logger.warning("Create assessments rejected: %s", reason)
+    return ModelResponse(
+        CreateAssessmentsResponse(
+            resultVersion="1.0.0", key="createAssessment", success=False, results=[]
+        ),
+        status_code=422,
+    )
+
+
+def webhook_events(body):
+    """
+    Normalise a webhook body into its latest event per assessment
+
+    The assessment service sends a single event, or ``{"events": [...]}`` when
+    it has coalesced several updates; a bare list is accepted too. Later events
+    for the same ``id`` replace earlier ones. Invalid events are logged and
+    skipped, so one bad event does not hold back the updates for the others.
+
+    Args:
+        body (dict | list): The decoded webhook body
+
+    Returns:
+        list[dict]: One event per assessment id, in first-seen order
+
+    Raises:
+        ValueError: If the body holds no valid event
+    """
+    if isinstance(body, dict) and "events" in body:
+        events = body["events"]
+    elif isinstance(body, list):
+        events = body
+    else:
+        events = [body]
+    if not isinstance(events, list):
+        raise ValueError("Webhook events are not a list")
+    latest = {}
+    for event in events:
+        try:
+            validate_event(event)
+        except ValueError as e:
+            logger.warning("Webhook event skipped: %s", e)
+            continue
+        latest[event["id"]] = event
+    if not latest:
+        raise ValueError("No valid events in webhook body")
+    return list(latest.values())
+
+
+def validate_event(event):
+    """
+    Check a webhook event has everything an assessment update needs
+
+    Args:
+        event (dict): One decoded event
+
+    Raises:
+        ValueError: If the id, status or score is missing or the wrong type
+    """
+    if not isinstance(event, dict):
+        raise ValueError("Webhook event is not an object")
+    for key in ("id", "status"):
+        if not isinstance(event.get(key), str):
+            raise ValueError(f"Webhook event has no {key}")
+    score = event.get("score")
+    if isinstance(score, bool) or not isinstance(score, (int, str)):
+        raise ValueError(f"Webhook event {event['id']} has no score")
+    try:
+        int(score)
+    except ValueError:
+        raise ValueError(f"Webhook event {event['id']} has a non-numeric score")
+
+
+def webhook_body(raw, signature, api_keys):
+    """
+    Return the signed webhook body from a ``/webhook`` request
+
+    Pinpoint wraps the assessment service's POST as ``{"body": "<json>"}``; a
+    body posted directly is accepted too. The signature is checked over the
+    exact bytes the assessment service sent, before those bytes are decoded.
+
+    Args:
+        raw (bytes): The ``/webhook`` request body
+        signature (str): The ``X-Verify`` header value
+        api_keys (tuple[str]): The tenant's active API keys
+
+    Returns:
+        bytes: The verified body
+
+    Raises:
+        PermissionError: If the signature does not match any active key
+        ValueError: If the request is not valid JSON
+    """
+    if webhook_verifier.verify(raw, signature, api_keys):
+        return raw
+    wrapper = json.loads(raw)
+    body = wrapper.get("body") if isinstance(wrapper, dict) else None
+    if isinstance(body, str):
+        body = body.encode("utf-8")
+        if webhook_verifier.verify(body, signature, api_keys):
+            return body
+    raise PermissionError("Webhook signature does not match")
+
+
+def assessment_update(event):
+    return AssessmentUpdate(
+        externalIdentifier=event["id"],
+        status=event["status"],
+        score=int(event["score"]),
+        shouldNotify=True,
+        externalLinks=[
+            ExternalLink(
+                key="report",
+                label="Report",
+                url=f"{ASSESSMENT_REPORT_PATH}{event.get('report_path')}",
+            )
         ],
-    }
+    )
+
+
+def webhook_rejected(status_code, reason):
+    logger.warning("Webhook rejected: %s", reason)
+    return ModelResponse(
+        WebhookResponse(resultVersion="1.0.0", success=False, updateAssessments=[]),
+        status_code=status_code,
+    )
+
+
+@app.post("/webhook", responses={200: {"model": WebhookResponse}})
+async def process_webhook(request: Request):
+    api_keys = tuple(
+        key
+        for key in (
+            request.headers.get("x_example_assessments_key"),
+            request.headers.get("x_example_previous_assessments_key"),
+        )
+        if key
+    )
+    try:
+        body = webhook_body(
+            await request.body(), request.headers.get(SIGNATURE_HEADER), api_keys
+        )
+    except PermissionError as e:
+        return webhook_rejected(401, e)
+    except ValueError as e:
+        return webhook_rejected(400, e)
+
+    # Every event carries a score, so a body without one is refused before decoding
+    if b'"score"' not in body:
+        return webhook_rejected(422, "no score in webhook body")
+    try:
+        events = webhook_events(json.loads(body))
+    except ValueError as e:
+        return webhook_rejected(422, e)
+    logger.debug("Webhook data received", extra=fields(body=events))
+
+    return ModelResponse(
+        WebhookResponse(
+            resultVersion="1.0.0",
+            success=True,
+            updateAssessments=[assessment_update(event) for event in events],
+        )
+    )
 
 
 if __name__ == "__main__":
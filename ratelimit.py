@@ -0,0 +1,174 @@
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Buckets kept at once by a keyed limiter
+MAX_KEYS = 10000
+# The SQLite limiter drops the longest idle buckets once every this many acquisitions
+PRUNE_EVERY = 1000
+
+
+class TokenBucket:
+    """
+    Token bucket allowing ``rate`` operations per second with bursts of ``capacity``
+
+    Args:
+        rate (float): Tokens added per second
+        capacity (float): Maximum tokens held, i.e. the largest burst allowed
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self, tokens=1):
+        """
+        Take ``tokens`` if they are available
+
+        Args:
+            tokens (float): Number of tokens the operation costs
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds until they will
+            be available
+        """
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Token buckets per key, such as an (API key, route) pair
+
+    Args:
+        rate (float): Tokens added per second to each bucket
+        capacity (float): Largest burst allowed per key
+        max_keys (int): Buckets kept in memory, evicting the least recently used
+    """
+
+    def __init__(self, rate, capacity, max_keys=MAX_KEYS):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    def try_acquire(self, key, tokens=1):
+        """
+        Take ``tokens`` from the bucket for ``key`` if they are available
+
+        Args:
+            key (tuple[str]): The bucket key
+            tokens (float): Number of tokens the operation costs
+
+        Returns:
+            float: 0 if the tokens were taken, otherwise seconds until they will
+            be available
+        """
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            # An evicted bucket comes back full, which only ever errs towards allowing
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.try_acquire(tokens)
+
+
+class SQLiteRateLimiter(RateLimiter):
+    """
+    Rate limiter whose buckets live in SQLite, shared by every worker process
+
+    Each acquisition reads and updates its bucket in one ``BEGIN IMMEDIATE``
+    transaction, so concurrent workers draw from the same budget.
+
+    Args:
+        path (str): Path to the SQLite database
+        rate (float): Tokens added per second to each bucket
+        capacity (float): Largest burst allowed per key
+        max_keys (int): Buckets kept, dropping those idle longest in batches
+    """
+
+    def __init__(self, path, rate, capacity, max_keys=MAX_KEYS):
+        super().__init__(rate, capacity, max_keys)
+        self._acquisitions = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS buckets_updated ON buckets (updated_at)"
+        )
+        self._lock = threading.Lock()
+
+    def try_acquire(self, key, tokens=1):
+        name = "\n".join(key)
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                # Wall-clock time, since monotonic clocks differ between processes
+                now = time.time()
+                row = self._db.execute(
+                    "SELECT tokens, updated_at FROM buckets WHERE key = ?", (name,)
+                ).fetchone()
+                available = self.capacity
+                if row is not None:
+                    available = min(
+                        self.capacity, row[0] + max(0.0, now - row[1]) * self.rate
+                    )
+                wait = 0.0
+                if available >= tokens:
+                    available -= tokens
+                else:
+                    wait = (tokens - available) / self.rate
+                self._db.execute(
+                    "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                    (name, available, now),
+                )
+                self._acquisitions += 1
+                if self._acquisitions % PRUNE_EVERY == 0:
+                    self._db.execute(
+                        "DELETE FROM buckets WHERE key IN ("
+                        "SELECT key FROM buckets ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_keys,),
+                    )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return wait
+
+
+def create_rate_limiter(rate, capacity, path=None, max_keys=MAX_KEYS):
+    """
+    Create a keyed rate limiter, in memory or backed by SQLite
+
+    Args:
+        rate (float): Tokens added per second to each bucket
+        capacity (float): Largest burst allowed per key
+        path (str): SQLite database path shared by all workers; None keeps
+            buckets per process
+        max_keys (int): Maximum number of buckets kept
+
+    Returns:
+        RateLimiter: The limiter
+    """
+    if path is None:
+        return RateLimiter(rate, capacity, max_keys)
+    return SQLiteRateLimiter(path, rate, capacity, max_keys)
@@ -0,0 +1,133 @@
+import sys
+from datetime import datetime
+from functools import lru_cache
+
+
+_UNSET = object()
+
+
+def _text(value):
+    if type(value) is not str:
+        raise TypeError(f"Expected a string, got {type(value).__name__}")
+    return value
+
+
+def _interned(value):
+    return sys.intern(_text(value))
+
+
+def _integer(value):
+    # Scores arrive as form strings; only canonical ones such as "87" are stored as ints
+    number = int(_text(value))
+    if str(number) != value:
+        raise ValueError(f"Not a canonical integer: {value!r}")
+    return number
+
+
+@lru_cache(maxsize=4096)
+def _timestamp(value):
+    # Timestamps are written as "%Y-%m-%d %H:%M:%S" local time; records created
+    # together share one, so equal strings also share one datetime
+    moment = datetime.fromisoformat(_text(value))
+    if _isoformat(moment) != value:
+        raise ValueError(f"Not a %Y-%m-%d %H:%M:%S timestamp: {value!r}")
+    return moment
+
+
+@lru_cache(maxsize=4096)
+def _isoformat(value):
+    return value.isoformat(" ")
+
+
+# JSON key -> (decode to a native value, encode back to the JSON value), in the
+# order build_assessment() writes them so round-tripped records keep their key order.
+# Decoders raise TypeError or ValueError for anything they cannot encode back exactly
+FIELD_CODECS = {
+    "id": (_text, None),
+    "name": (_text, None),
+    "email": (_text, None),
+    # A handful of distinct values repeated across every record, so interned
+    "status": (_interned, None),
+    "description": (_interned, None),
+    "webhook_url": (_interned, None),
+    "platform_url": (_interned, None),
+    "created_at": (_timestamp, _isoformat),
+    "updated_at": (_timestamp, _isoformat),
+    "score": (_integer, str),
+}
+
+
+class AssessmentRecord:
+    """
+    Slotted in-memory form of an assessment record
+
+    Holds each known field as a native value: ``created_at``/``updated_at`` as
+    ``datetime``, ``score`` as ``int`` and repeated strings interned, with no
+    per-record key strings. A value that would not convert back to exactly
+    the same JSON value (a non-canonical score, a timestamp in another format,
+    an unknown key) is kept verbatim in ``extra``, so
+    ``AssessmentRecord.from_dict(record).to_dict() == record`` always holds.
+    Fields the record does not have are left unset.
+    """
+
+    __slots__ = (*FIELD_CODECS, "extra")
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Build a record from its JSON shape
+
+        Args:
+            data (dict): The assessment as stored in the journal
+
+        Returns:
+            AssessmentRecord: The compact record
+        """
+        record = cls()
+        extra = None
+        for key, value in data.items():
+            codec = FIELD_CODECS.get(key)
+            if codec is not None:
+                try:
+                    setattr(record, key, value if value is None else codec[0](value))
+                    continue
+                except (TypeError, ValueError):
+                    pass
+            if extra is None:
+                extra = {}
+            extra[key] = value
+        record.extra = extra
+        return record
+
+    def to_dict(self):
+        """
+        Convert back to the JSON shape
+
+        Returns:
+            dict: The assessment exactly as it was passed to ``from_dict``
+        """
+        data = {}
+        for key, (_, encode) in FIELD_CODECS.items():
+            value = getattr(self, key, _UNSET)
+            if value is not _UNSET:
+                data[key] = value if value is None or encode is None else encode(value)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def get(self, key, default=None):
+        """
+        Return a field's native value, or its raw JSON value if it is kept in ``extra``
+
+        Args:
+            key (str): The JSON key
+            default: Returned when the record does not have the field
+        """
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        if key in FIELD_CODECS:
+            return getattr(self, key, default)
+        return default
+
+    def __repr__(self):
+        return f"AssessmentRecord({self.to_dict()!r})"
@@ -0,0 +1,17 @@
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+class ModelResponse(JSONResponse):
+    """
+    JSON response that serialises pydantic models directly with pydantic-core
+
+    Returning this from a handler skips FastAPI's generic ``jsonable_encoder``
+    pass. Unset optional fields (``None``) are left out, matching the shape of
+    the hand-written dicts the handlers used to return.
+    """
+
+    def render(self, content):
+        if isinstance(content, BaseModel):
+            return content.model_dump_json(exclude_none=True).encode("utf-8")
+        return super().render(content)
@@ -0,0 +1,109 @@
+import hashlib
+import hmac
+from collections import OrderedDict
+
+# Header the assessment service signs webhook bodies in; advertised to
+# Pinpoint as webhookAuthenticationHeader
+SIGNATURE_HEADER = "X-Verify"
+SIGNATURE_SCHEME = "sha256"
+# Tenants whose precomputed keys are kept in memory
+MAX_CACHED_TENANTS = 1024
+
+_KEY_CONTEXT = b"example-assessments webhook signature"
+
+
+def derive_key(api_key):
+    """
+    Derive a tenant's webhook signing key from its API key
+
+    Both services already hold the tenant's API key, so no extra secret has to
+    be shared, and the API key itself never signs anything.
+
+    Args:
+        api_key (str): The tenant's API key
+
+    Returns:
+        bytes: The signing key
+    """
+    return hmac.new(api_key.encode("utf-8"), _KEY_CONTEXT, hashlib.sha256).digest()
+
+
+def sign(body, key):
+    """
+    Sign a webhook body
+
+    Args:
+        body (bytes): The exact bytes sent
+        key (bytes): Signing key from ``derive_key``
+
+    Returns:
+        str: ``sha256=<hex digest>``, the ``X-Verify`` header value
+    """
+    return f"{SIGNATURE_SCHEME}={hmac.new(key, body, hashlib.sha256).hexdigest()}"
+
+
+def _signatures(header):
+    # Several comma-separated signatures are allowed, e.g. while the sender rotates keys
+    signatures = []
+    for part in header.split(","):
+        scheme, _, value = part.strip().partition("=")
+        if scheme == SIGNATURE_SCHEME and value:
+            signatures.append(value.encode("ascii", "replace"))
+    return signatures
+
+
+class WebhookVerifier:
+    """
+    Checks webhook signatures against each tenant's active keys
+
+    A tenant can have several active keys at once, e.g. its current and
+    previous API key while it rotates them; a body signed with any of them is
+    accepted. The HMAC state for each key is computed once and cached per
+    tenant, so a check only hashes the body, and digests are compared in
+    constant time.
+
+    Args:
+        max_tenants (int): Tenants whose keys are kept in memory
+    """
+
+    def __init__(self, max_tenants=MAX_CACHED_TENANTS):
+        self.max_tenants = max_tenants
+        self._keys = OrderedDict()
+
+    def verify(self, body, header, api_keys):
+        """
+        Check a webhook signature
+
+        Args:
+            body (bytes): The raw webhook body, exactly as signed
+            header (str): The ``X-Verify`` header value
+            api_keys (tuple[str]): The tenant's active API keys
+
+        Returns:
+            bool: True if the body was signed with one of the keys
+        """
+        signatures = _signatures(header or "")
+        if not signatures:
+            return False
+        valid = False
+        for key in self._tenant_keys(api_keys):
+            mac = key.copy()
+            mac.update(body)
+            expected = mac.hexdigest().encode("ascii")
+            for signature in signatures:
+                # No early exit, so timing does not reveal which key matched
+                valid |= hmac.compare_digest(expected, signature)
+        return valid
+
+    def _tenant_keys(self, api_keys):
+        keys = self._keys.get(api_keys)
+        if keys is None:
+            keys = self._keys[api_keys] = [
+                hmac.new(derive_key(api_key), digestmod=hashlib.sha256)
+                for api_key in api_keys
+            ]
+            while len(self._keys) > self.max_tenants:
+                self._keys.popitem(last=False)
+        else:
+            self._keys.move_to_end(api_keys)
+        return keys
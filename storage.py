@@ -0,0 +1,690 @@
+import json
+import logging
+import marshal
+import mmap
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, run a single worker
+    fcntl = None
+
+from metrics import observe_db
+from records import AssessmentRecord
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_PATH = "assessments_database.jsonl"
+LEGACY_DATABASE_PATH = "assessments_database.json"
+
+# Compact once the journal holds this many lines per live record, so the
+# O(N) rewrite happens at most once every N writes (amortised O(1) per write).
+COMPACTION_RATIO = 2
+COMPACTION_MIN_LINES = 1000
+
+# Binary copy of the index, written next to the journal, that a restart loads
+# instead of parsing every JSON line; rewritten once a load had to parse at
+# least SNAPSHOT_MIN_LINES lines
+SNAPSHOT_SUFFIX = ".index"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MIN_LINES = 1000
+# The snapshot stores the journal bytes just before the offset it covers, so a
+# rewritten journal that happens to reuse the inode is not mistaken for the same one
+SNAPSHOT_CHECK_BYTES = 64
+# Where bytes cut from a corrupt or torn journal tail are kept for inspection
+CORRUPT_SUFFIX = ".corrupt"
+# Journal lines carrying this key remove the record with their id
+TOMBSTONE_KEY = "_deleted"
+
+
+def _encode(record):
+    return (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _iter_json_array(file, chunk_size=1 << 16):
+    """Yield the items of a top-level JSON array one at a time, reading in chunks"""
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = file.read(chunk_size)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+    def skip(characters):
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in characters:
+                position += 1
+            if position < len(buffer) or eof:
+                return
+            fill()
+
+    fill()
+    skip(" \t\r\n")
+    if buffer[position : position + 1] != "[":
+        raise json.JSONDecodeError("Expected '['", buffer, position)
+    position += 1
+    while True:
+        skip(" \t\r\n,")
+        if position >= len(buffer):
+            raise json.JSONDecodeError("Unterminated array", buffer, position)
+        if buffer[position] == "]":
+            return
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+            # A number cut off at a chunk boundary still decodes; read on to be sure
+            if end == len(buffer) and not eof:
+                fill()
+                continue
+            break
+        position = end
+        yield item
+
+
+def _fsync_directory(path):
+    directory = os.path.dirname(os.path.abspath(path))
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class AssessmentStore:
+    """
+    Append-only journal of assessment records with an in-memory primary key index
+
+    Every write appends one JSON line holding the full changed record; on load
+    the last line for an id wins. Records are held in memory as slotted
+    ``AssessmentRecord`` objects and returned to callers as fresh dicts. The
+    journal is periodically compacted into one line per record via an atomic
+    rename, and an existing ``assessments_database.json`` file is migrated on
+    first start.
+
+    Several processes (e.g. ``uvicorn --workers 4``) can share one journal.
+    Writes hold an exclusive ``flock`` on ``<path>.lock`` and first replay any
+    lines other processes appended, and every read checks the journal's size
+    and inode so each process picks up other processes' writes and compactions.
+
+    Args:
+        path (str): Path to the JSON lines journal
+        legacy_path (str): Path to the legacy whole-file JSON database
+        fsync (bool): Whether to fsync after every write
+        snapshot (bool): Whether to keep a binary index snapshot for fast restarts
+    """
+
+    def __init__(
+        self,
+        path=JOURNAL_PATH,
+        legacy_path=LEGACY_DATABASE_PATH,
+        fsync=True,
+        snapshot=True,
+    ):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.fsync = fsync
+        self.snapshot = snapshot
+        self._records = {}
+        self._by_email = {}
+        self._by_status = {}
+        self._order = []
+        self._position = {}
+        self._journal_lines = 0
+        self._offset = 0
+        self._inode = None
+        self._file = None
+        self._lock = threading.RLock()
+        self._lock_file = open(f"{path}.lock", "a+b")
+        self._lock_depth = 0
+        self._stalled_at = None
+        self.load()
+
+    def __len__(self):
+        self.refresh()
+        return len(self._records)
+
+    def __iter__(self):
+        self.refresh()
+        with self._lock:
+            records = list(self._records.values())
+        return (record.to_dict() for record in records)
+
+    def __contains__(self, id):
+        self.refresh()
+        return id in self._records
+
+    def get(self, id):
+        """
+        Look up an assessment by id
+
+        Args:
+            id (str): The assessment id
+
+        Returns:
+            dict | None: The assessment record, or None if it does not exist
+        """
+        self.refresh()
+        record = self._records.get(id)
+        return record.to_dict() if record is not None else None
+
+    def find_by_email(self, email):
+        """
+        Return all assessments sent to a candidate email address
+
+        Args:
+            email (str): The candidate email
+
+        Returns:
+            list[dict]: Matching assessment records
+        """
+        self.refresh()
+        with self._lock:
+            return [self._records[id].to_dict() for id in self._by_email.get(email, ())]
+
+    def find_by_status(self, status):
+        """
+        Return all assessments currently in a given status
+
+        Args:
+            status (str): One of the allowed assessment statuses
+
+        Returns:
+            list[dict]: Matching assessment records
+        """
+        self.refresh()
+        with self._lock:
+            return [
+                self._records[id].to_dict() for id in self._by_status.get(status, ())
+            ]
+
+    def scan(self, after=None, email=None, status=None):
+        """
+        Lazily yield assessments in creation order
+
+        Only one record is materialised at a time, so callers can stream any
+        number of records in constant memory.
+
+        Args:
+            after (str): Only yield records created after the assessment with this id
+            email (str): Only yield records for this candidate email, using the
+                email index
+            status (str): Only yield records in this status, using the status index; a
+                record whose status changes during the scan may still be yielded
+
+        Yields:
+            dict: Assessment records
+
+        Raises:
+            KeyError: If ``after`` is not a known assessment id
+        """
+        self.refresh()
+        start = self._position[after] + 1 if after is not None else 0
+        if email is not None or status is not None:
+            with self._lock:
+                filters = ((self._by_email, email), (self._by_status, status))
+                indexes = [
+                    index.get(value, {})
+                    for index, value in filters
+                    if value is not None
+                ]
+                smallest = min(indexes, key=len)
+                positions = sorted(
+                    self._position[id]
+                    for id in smallest
+                    if all(id in index for index in indexes)
+                )
+            ids = (self._order[position] for position in positions if position >= start)
+        else:
+            ids = (self._order[position] for position in range(start, len(self._order)))
+        for id in ids:
+            record = self._records.get(id)
+            if record is not None:
+                yield record.to_dict()
+
+    def load(self):
+        """
+        Rebuild the in-memory index from the journal, migrating legacy data if needed
+
+        Records are streamed line by line into the indexes, starting from the
+        index snapshot when it matches the journal. A torn or corrupt tail is
+        logged, moved to ``<path>.corrupt`` and cut off, keeping every record
+        before it.
+        """
+        with self._exclusive():
+            if not os.path.exists(self.path) and os.path.exists(self.legacy_path):
+                self._migrate_legacy()
+            parsed = self._reload()
+            self._truncate_tail()
+            if self.snapshot and parsed >= SNAPSHOT_MIN_LINES:
+                self._write_index_snapshot()
+
+    def refresh(self):
+        """Pick up records written by other processes since the last read"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size != self._offset:
+            with self._lock:
+                self._catch_up()
+
+    def put(self, record):
+        """
+        Insert or replace a single assessment, appending only that record to disk
+
+        Args:
+            record (dict): The assessment record, which must contain an ``id``
+        """
+        self.put_many([record])
+
+    def put_many(self, records):
+        """
+        Insert or replace several assessments with a single append and fsync
+
+        Args:
+            records (list[dict]): The assessment records, each with an ``id``
+        """
+        data = b"".join(_encode(record) for record in records)
+        with self._exclusive():
+            self._catch_up()
+            self._truncate_tail()
+            self._append(data)
+            for record in records:
+                self._set(record)
+            self._journal_lines += len(records)
+            if self._needs_compaction():
+                self._compact()
+
+    def insert_many(self, records):
+        """
+        Insert assessments with new ids in a single append and fsync
+
+        The existence check happens under the cross-process lock after
+        replaying other processes' writes, so two workers inserting the same id
+        never both succeed.
+
+        Args:
+            records (list[dict]): The new assessment records, each with an ``id``
+
+        Returns:
+            dict: The current record for every id that already existed and was
+            left untouched, keyed by id
+        """
+        with self._exclusive():
+            self._catch_up()
+            self._truncate_tail()
+            existing = {}
+            for record in records:
+                current = self._records.get(record["id"])
+                if current is not None:
+                    existing[record["id"]] = current.to_dict()
+            new = [record for record in records if record["id"] not in existing]
+            if new:
+                self._append(b"".join(_encode(record) for record in new))
+                for record in new:
+                    self._set(record)
+                self._journal_lines += len(new)
+                if self._needs_compaction():
+                    self._compact()
+            return existing
+
+    def update(self, id, changes):
+        """
+        Apply ``changes`` to the latest version of an assessment and persist it
+
+        The read and the write happen under the cross-process lock, so a
+        concurrent update to other fields by another worker is never lost.
+
+        Args:
+            id (str): The assessment id
+            changes (dict): Fields to set
+
+        Returns:
+            dict | None: The updated record, or None if the id does not exist
+        """
+        with self._exclusive():
+            self._catch_up()
+            self._truncate_tail()
+            current = self._records.get(id)
+            if current is None:
+                return None
+            record = {**current.to_dict(), **changes}
+            self._append(_encode(record))
+            self._set(record)
+            self._journal_lines += 1
+            if self._needs_compaction():
+                self._compact()
+            return record
+
+    def remove_where(self, predicate, before_remove=None, limit=None, statuses=None):
+        """
+        Remove the assessments matching ``predicate``, appending a tombstone for each
+
+        Args:
+            predicate (callable): Called with each ``AssessmentRecord``; return
+                True to remove it
+            before_remove (callable): Called with the matching records, as dicts,
+                before they are removed and while the cross-process lock is
+                held, e.g. to archive them first
+            limit (int): Remove at most this many records
+            statuses (iterable[str]): Only consider records in these statuses,
+                found through the status index rather than a full scan
+
+        Returns:
+            list[dict]: The removed records
+        """
+        with self._exclusive():
+            self._catch_up()
+            self._truncate_tail()
+            if statuses is None:
+                candidates = self._records
+            else:
+                candidates = (
+                    id for status in statuses for id in self._by_status.get(status, ())
+                )
+            ids = []
+            for id in candidates:
+                if limit is not None and len(ids) >= limit:
+                    break
+                if predicate(self._records[id]):
+                    ids.append(id)
+            if not ids:
+                return []
+            removed = [self._records[id].to_dict() for id in ids]
+            if before_remove is not None:
+                before_remove(removed)
+            self._append(
+                b"".join(_encode({"id": id, TOMBSTONE_KEY: True}) for id in ids)
+            )
+            for id in ids:
+                self._remove(id)
+            self._journal_lines += len(ids)
+            if self._needs_compaction():
+                self._compact()
+            return removed
+
+    def replace_all(self, records):
+        """
+        Replace the whole database with ``records`` in a single atomic rewrite
+
+        Args:
+            records (iterable[dict]): The assessment records to keep
+        """
+        with self._exclusive():
+            self._reset_indexes()
+            for record in records:
+                self._set(record)
+            self._compact()
+
+    def compact(self):
+        """Rewrite the journal so it holds exactly one line per live record"""
+        with self._exclusive():
+            self._catch_up()
+            self._compact()
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    @contextmanager
+    def _exclusive(self):
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and fcntl is not None:
+                    fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _catch_up(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # Another process compacted or replaced the journal
+            self._reload()
+        elif stat.st_size > self._offset:
+            self._read_from(self._offset)
+
+    def _reload(self):
+        """Rebuild the indexes from scratch; returns the number of JSON lines parsed"""
+        self._close()
+        self._reset_indexes()
+        self._journal_lines = 0
+        self._offset = 0
+        self._inode = None
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        self._inode = stat.st_ino
+        if self.snapshot:
+            self._load_index_snapshot(stat)
+        return self._read_from(self._offset)
+
+    def _read_from(self, offset):
+        """Apply complete lines from ``offset`` on; returns the number applied"""
+        started, start_offset, lines = time.perf_counter(), offset, 0
+        try:
+            with open(self.path, "rb") as file:
+                file.seek(offset)
+                for line in file:
+                    if not line.endswith(b"\n"):
+                        # Torn write from a crash, or a write still in progress
+                        break
+                    try:
+                        record = json.loads(line)
+                        id = record["id"]
+                    except (ValueError, TypeError, KeyError):
+                        if self._stalled_at != offset:
+                            self._stalled_at = offset
+                            logger.error(
+                                "Corrupt record in %s at byte %d; later records are not loaded",
+                                self.path,
+                                offset,
+                            )
+                        break
+                    if record.get(TOMBSTONE_KEY):
+                        self._remove(id)
+                    else:
+                        self._set(record)
+                    self._journal_lines += 1
+                    offset += len(line)
+                    lines += 1
+        except FileNotFoundError:
+            return 0
+        self._offset = offset
+        observe_db("read", started, offset - start_offset)
+        return lines
+
+    def _truncate_tail(self):
+        """Cut anything after the last good line; only safe holding the file lock"""
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return
+        if size <= self._offset:
+            return
+        # Every writer holds the lock we hold, so this is a torn write from a
+        # crashed process or corrupt data, never a write in progress
+        with open(self.path, "r+b") as file:
+            file.seek(self._offset)
+            tail = file.read()
+            with open(f"{self.path}{CORRUPT_SUFFIX}", "ab") as saved:
+                saved.write(tail)
+            file.truncate(self._offset)
+            file.flush()
+            os.fsync(file.fileno())
+        self._stalled_at = None
+        logger.error(
+            "Truncated %d bytes (%d lines) after byte %d of %s; saved to %s%s",
+            len(tail),
+            tail.count(b"\n") + (not tail.endswith(b"\n")),
+            self._offset,
+            self.path,
+            self.path,
+            CORRUPT_SUFFIX,
+        )
+
+    def _snapshot_check(self, offset):
+        with open(self.path, "rb") as file:
+            file.seek(max(0, offset - SNAPSHOT_CHECK_BYTES))
+            return file.read(min(offset, SNAPSHOT_CHECK_BYTES))
+
+    def _load_index_snapshot(self, stat):
+        started = time.perf_counter()
+        try:
+            with open(f"{self.path}{SNAPSHOT_SUFFIX}", "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                    version, inode, offset, lines, check, records = marshal.loads(view)
+        except (OSError, ValueError, EOFError, TypeError):
+            return
+        if (
+            version != SNAPSHOT_VERSION
+            or inode != stat.st_ino
+            or offset > stat.st_size
+            or self._snapshot_check(offset) != check
+        ):
+            return
+        for record in records:
+            self._set(record)
+        self._journal_lines = lines
+        self._offset = offset
+        observe_db("index_read", started, offset)
+
+    def _write_index_snapshot(self):
+        started = time.perf_counter()
+        data = marshal.dumps(
+            (
+                SNAPSHOT_VERSION,
+                self._inode,
+                self._offset,
+                self._journal_lines,
+                self._snapshot_check(self._offset),
+                [record.to_dict() for record in self._records.values()],
+            )
+        )
+        tmp_path = f"{self.path}{SNAPSHOT_SUFFIX}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, f"{self.path}{SNAPSHOT_SUFFIX}")
+        observe_db("index_write", started, len(data))
+
+    def _reset_indexes(self):
+        self._records = {}
+        self._by_email = {}
+        self._by_status = {}
+        self._order = []
+        self._position = {}
+
+    def _set(self, data):
+        record = AssessmentRecord.from_dict(data)
+        id = data["id"]
+        if id not in self._position:
+            self._position[id] = len(self._order)
+            self._order.append(id)
+        email, status = record.get("email"), record.get("status")
+        previous = self._records.get(id)
+        if previous is None:
+            # dicts used as ordered sets so results keep creation order
+            self._by_email.setdefault(email, {})[id] = None
+            self._by_status.setdefault(status, {})[id] = None
+        else:
+            if previous.get("email") != email:
+                self._by_email[previous.get("email")].pop(id, None)
+                self._by_email.setdefault(email, {})[id] = None
+            if previous.get("status") != status:
+                self._by_status[previous.get("status")].pop(id, None)
+                self._by_status.setdefault(status, {})[id] = None
+        self._records[id] = record
+
+    def _remove(self, id):
+        # The id keeps its slot in _order; scans skip ids with no record
+        record = self._records.pop(id, None)
+        if record is not None:
+            self._by_email[record.get("email")].pop(id, None)
+            self._by_status[record.get("status")].pop(id, None)
+
+    def _needs_compaction(self):
+        return (
+            self._journal_lines >= COMPACTION_MIN_LINES
+            and self._journal_lines > COMPACTION_RATIO * len(self._records)
+        )
+
+    def _compact(self):
+        self._close()
+        self._write_snapshot(
+            self.path, (record.to_dict() for record in self._records.values())
+        )
+        self._journal_lines = len(self._records)
+        stat = os.stat(self.path)
+        self._inode = stat.st_ino
+        self._offset = stat.st_size
+        if self.snapshot:
+            self._write_index_snapshot()
+
+    def _append(self, data):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            self._inode = os.fstat(self._file.fileno()).st_ino
+        started = time.perf_counter()
+        self._file.write(data)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._offset += len(data)
+        observe_db("append", started, len(data))
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_snapshot(self, path, records):
+        tmp_path = f"{path}.tmp"
+        started = time.perf_counter()
+        with open(tmp_path, "wb") as file:
+            for record in records:
+                file.write(_encode(record))
+            file.flush()
+            os.fsync(file.fileno())
+            size = file.tell()
+        os.replace(tmp_path, path)
+        _fsync_directory(path)
+        observe_db("snapshot", started, size)
+
+    def _migrate_legacy(self):
+        records = []
+        with open(self.legacy_path, "r") as file:
+            try:
+                for record in _iter_json_array(file):
+                    records.append(record)
+            except json.JSONDecodeError as e:
+                # Keep what could be read; the legacy file itself is left untouched
+                logger.error(
+                    "%s is corrupt (%s); migrated the %d records before the error",
+                    self.legacy_path,
+                    e.msg,
+                    len(records),
+                )
+        self._write_snapshot(self.path, records)
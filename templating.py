@@ -0,0 +1,51 @@
+import os
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+
+TEMPLATE_DIRECTORY = "templates"
+# Compiled template bytecode, shared by every worker started from this directory
+BYTECODE_CACHE_DIRECTORY = ".jinja_cache"
+
+
+def create_environment(
+    directory=TEMPLATE_DIRECTORY, cache_directory=BYTECODE_CACHE_DIRECTORY
+):
+    """
+    Create the Jinja environment for the HTML pages
+
+    Compiled templates are stored in ``cache_directory``, so a freshly started
+    worker loads bytecode instead of parsing and compiling every template.
+
+    Args:
+        directory (str): Directory holding the templates
+        cache_directory (str): Directory for the bytecode cache; None disables it
+
+    Returns:
+        jinja2.Environment: The environment, with autoescaping enabled
+    """
+    bytecode_cache = None
+    if cache_directory is not None:
+        os.makedirs(cache_directory, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(cache_directory)
+    return Environment(
+        loader=FileSystemLoader(directory),
+        autoescape=True,
+        bytecode_cache=bytecode_cache,
+        auto_reload=False,
+    )
+
+
+def precompile(environment):
+    """
+    Load every template so the first request does not pay for compiling it
+
+    Args:
+        environment (jinja2.Environment): The environment to warm
+
+    Returns:
+        int: Number of templates loaded
+    """
+    names = environment.list_templates()
+    for name in names:
+        environment.get_template(name)
+    return len(names)
@@ -0,0 +1,217 @@
+import logging
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+
+from ratelimit import TokenBucket
+from upstream import (
+    ASSESSMENT_SERVICE_URL,
+    CircuitBreaker,
+    ResilientClient,
+    create_client,
+)
+
+logger = logging.getLogger(__name__)
+
+# Pools kept open at once, and how long an unused pool survives
+MAX_TENANTS = 64
+IDLE_TIMEOUT = 300.0
+SWEEP_INTERVAL = 30.0
+# Each tenant gets its own connection pool of this size and its own request
+# budget, so a slow or busy backend only ever queues its own requests
+TENANT_MAX_CONNECTIONS = 20
+TENANT_RATE = 50.0
+TENANT_BURST = 100
+# Hosts (host:port) a tenant may point apiBaseURL at. The provider forwards the
+# tenant's API key to that host, so it must never be an arbitrary address
+ALLOWED_HOSTS = ("localhost:8001", "127.0.0.1:8001")
+
+
+class TenantRateLimited(Exception):
+    """
+    Raised when a tenant has used up its request budget
+
+    Args:
+        base_url (str): The tenant's base URL
+        retry_after (float): Seconds until a request would be allowed
+    """
+
+    def __init__(self, base_url, retry_after):
+        super().__init__(
+            f"Too many requests to {base_url}, retry in {retry_after:.1f}s"
+        )
+        self.base_url = base_url
+        self.retry_after = retry_after
+
+
+def normalise_base_url(
+    value, default=ASSESSMENT_SERVICE_URL, allowed_hosts=ALLOWED_HOSTS
+):
+    """
+    Validate a tenant's configured base URL
+
+    Args:
+        value (str): The ``X_EXAMPLE_BASE_URL`` header value, possibly empty
+        default (str): URL used when the tenant did not configure one
+        allowed_hosts (tuple[str]): ``host:port`` values the URL may point at
+
+    Returns:
+        str: ``scheme://host[:port][/path]`` without a trailing slash
+
+    Raises:
+        ValueError: If the value is not an http(s) URL on an allowed host
+    """
+    if not value:
+        return default
+    parts = urlsplit(value.strip())
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError(f"Invalid base URL: {value}")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise ValueError(f"Invalid base URL: {value}")
+    if (
+        parts.username
+        or parts.password
+        or f"{parts.hostname}:{port}" not in allowed_hosts
+    ):
+        raise ValueError(f"Base URL host is not allowed: {value}")
+    return f"{parts.scheme}://{parts.netloc}{parts.path}".rstrip("/")
+
+
+class Tenant:
+    def __init__(self, base_url, client, rate, burst):
+        self.base_url = base_url
+        self.client = client
+        self.bucket = TokenBucket(rate, burst)
+        self.in_flight = 0
+        self.last_used = time.monotonic()
+
+
+class TenantClients:
+    """
+    Least recently used set of per-tenant upstream clients, keyed by base URL
+
+    Every tenant gets its own keep-alive pool, circuit breaker and token bucket.
+    Pools unused for ``idle_timeout`` seconds are closed, and when more than
+    ``max_tenants`` are open the least recently used idle pool is closed; pools
+    with requests in flight are never closed.
+
+    Args:
+        max_tenants (int): Pools kept open at once
+        idle_timeout (float): Seconds before an unused pool is closed
+        rate (float): Requests per second allowed per tenant
+        burst (int): Burst size allowed per tenant
+        max_connections (int): Connection pool size per tenant
+    """
+
+    def __init__(
+        self,
+        max_tenants=MAX_TENANTS,
+        idle_timeout=IDLE_TIMEOUT,
+        rate=TENANT_RATE,
+        burst=TENANT_BURST,
+        max_connections=TENANT_MAX_CONNECTIONS,
+    ):
+        self.max_tenants = max_tenants
+        self.idle_timeout = idle_timeout
+        self.rate = rate
+        self.burst = burst
+        self.max_connections = max_connections
+        self._tenants = OrderedDict()
+        self._last_sweep = time.monotonic()
+
+    @asynccontextmanager
+    async def client(self, base_url):
+        """
+        Borrow the client for a tenant, opening its pool on first use
+
+        Args:
+            base_url (str): The tenant's normalised base URL
+
+        Yields:
+            ResilientClient: Client whose relative URLs resolve against ``base_url``
+
+        Raises:
+            TenantRateLimited: If the tenant is over its request budget
+        """
+        await self._sweep()
+        tenant = self._tenants.get(base_url)
+        if tenant is None:
+            tenant = self._tenants[base_url] = Tenant(
+                base_url,
+                ResilientClient(
+                    create_client(
+                        base_url,
+                        max_connections=self.max_connections,
+                        max_keepalive_connections=self.max_connections,
+                    ),
+                    CircuitBreaker(base_url),
+                ),
+                self.rate,
+                self.burst,
+            )
+            logger.info("Opened upstream pool for %s", base_url)
+        self._tenants.move_to_end(base_url)
+        retry_after = tenant.bucket.try_acquire()
+        if retry_after:
+            raise TenantRateLimited(base_url, retry_after)
+        tenant.in_flight += 1
+        try:
+            yield tenant.client
+        finally:
+            tenant.in_flight -= 1
+            tenant.last_used = time.monotonic()
+        await self._evict_overflow()
+
+    def snapshot(self):
+        """
+        Describe every open tenant pool
+
+        Returns:
+            list[dict]: Base URL, requests in flight, idle seconds and breaker
+            state per tenant
+        """
+        now = time.monotonic()
+        return [
+            {
+                "base_url": tenant.base_url,
+                "in_flight": tenant.in_flight,
+                "idle_seconds": now - tenant.last_used if not tenant.in_flight else 0.0,
+                "breaker": tenant.client.breaker.snapshot(),
+            }
+            for tenant in self._tenants.values()
+        ]
+
+    async def aclose(self):
+        tenants, self._tenants = list(self._tenants.values()), OrderedDict()
+        for tenant in tenants:
+            await tenant.client.aclose()
+
+    async def _sweep(self):
+        now = time.monotonic()
+        if now - self._last_sweep < SWEEP_INTERVAL:
+            return
+        self._last_sweep = now
+        idle = [
+            tenant
+            for tenant in self._tenants.values()
+            if not tenant.in_flight and now - tenant.last_used > self.idle_timeout
+        ]
+        for tenant in idle:
+            await self._close(tenant)
+
+    async def _evict_overflow(self):
+        for tenant in list(self._tenants.values()):
+            if len(self._tenants) <= self.max_tenants:
+                return
+            if not tenant.in_flight:
+                await self._close(tenant)
+
+    async def _close(self, tenant):
+        # Another coroutine may have closed it while we awaited
+        if self._tenants.get(tenant.base_url) is tenant:
+            del self._tenants[tenant.base_url]
+            logger.info("Closed idle upstream pool for %s", tenant.base_url)
+            await tenant.client.aclose()
@@ -0,0 +1,36 @@
+import pytest
+
+from provider import webhook_events
+
+
+def event(id, status="completed", score="87"):
+    return {"id": id, "status": status, "score": score, "report_path": f"reports/{id}"}
+
+
+@pytest.mark.parametrize("body", [event("a"), [event("a")], {"events": [event("a")]}])
+def test_webhook_events_accepts_every_body_shape(body):
+    assert webhook_events(body) == [event("a")]
+
+
+def test_webhook_events_keeps_latest_event_per_assessment():
+    body = {"events": [event("a", score="10"), event("b"), event("a", score="20")]}
+    assert webhook_events(body) == [event("a", score="20"), event("b")]
+
+
+def test_webhook_events_skips_invalid_events():
+    body = {
+        "events": [
+            event("a"),
+            {"id": "b", "status": "completed"},
+            event("c", score="x"),
+        ]
+    }
+    assert webhook_events(body) == [event("a")]
+
+
+@pytest.mark.parametrize(
+    "body", [{"events": [{"id": "a"}]}, {"events": "a"}, {"events": []}, "a"]
+)
+def test_webhook_events_rejects_body_without_valid_events(body):
+    with pytest.raises(ValueError):
+        webhook_events(body)
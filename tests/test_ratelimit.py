@@ -0,0 +1,36 @@
+import pytest
+
+import ratelimit
+from ratelimit import TokenBucket
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_allows_a_full_burst_then_waits(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.try_acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.try_acquire() == pytest.approx(0.5)
+
+
+def test_refills_at_rate_up_to_capacity(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        bucket.try_acquire()
+    clock[0] += 1
+    assert bucket.try_acquire(2) == 0.0
+    assert bucket.try_acquire() == pytest.approx(0.5)
+    clock[0] += 60
+    assert bucket.tokens == 0
+    assert bucket.try_acquire(3) == 0.0
+    assert bucket.try_acquire(1) == pytest.approx(0.5)
+
+
+def test_failed_acquire_takes_nothing(clock):
+    bucket = TokenBucket(rate=1, capacity=2)
+    assert bucket.try_acquire(3) == pytest.approx(1.0)
+    assert bucket.try_acquire(2) == 0.0
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+import pytest
+
+from records import AssessmentRecord
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {
+            "id": "a",
+            "name": "Candidate",
+            "email": "candidate@example.com",
+            "status": "completed",
+            "description": "Hello World: The Journey Begins",
+            "webhook_url": "https://pinpoint.example.com/webhooks",
+            "platform_url": "https://pinpoint.example.com",
+            "created_at": "2025-01-01 09:00:00",
+            "updated_at": "2025-01-02 17:30:00",
+            "score": "87",
+        },
+        # Values the codecs cannot encode back exactly are kept verbatim
+        {"id": "b", "score": "087", "created_at": "2025-01-01T09:00:00"},
+        {"id": "c", "score": 87, "status": None, "unknown": [1, 2]},
+        {"created_at": "2025-01-01 09:00:00 +0100", "id": "d"},
+        {},
+    ],
+)
+def test_round_trip(data):
+    record = AssessmentRecord.from_dict(data)
+    assert record.to_dict() == data
+
+
+def test_round_trip_keeps_key_order():
+    data = {
+        "id": "a",
+        "name": "Candidate",
+        "email": "candidate@example.com",
+        "status": "pending",
+        "created_at": "2025-01-01 09:00:00",
+        "updated_at": "2025-01-01 09:00:00",
+        "score": "87",
+    }
+    assert list(AssessmentRecord.from_dict(data).to_dict()) == list(data)
+
+
+def test_native_values():
+    record = AssessmentRecord.from_dict(
+        {"id": "a", "score": "87", "created_at": "2025-01-01 09:00:00"}
+    )
+    assert record.get("score") == 87
+    assert record.get("created_at") == datetime(2025, 1, 1, 9)
+    assert record.get("email") is None
+    assert record.get("unknown", "default") == "default"
@@ -0,0 +1,41 @@
+import pytest
+
+from signing import WebhookVerifier, derive_key, sign
+
+BODY = b'{"id": "a", "status": "completed", "score": "87"}'
+
+
+def test_verifies_body_signed_with_active_key():
+    signature = sign(BODY, derive_key("current"))
+    assert WebhookVerifier().verify(BODY, signature, ("current",))
+
+
+def test_accepts_previous_key_while_rotating():
+    signature = sign(BODY, derive_key("previous"))
+    assert WebhookVerifier().verify(BODY, signature, ("current", "previous"))
+
+
+def test_accepts_any_of_several_signatures():
+    header = f"{sign(BODY, derive_key('old'))}, {sign(BODY, derive_key('current'))}"
+    assert WebhookVerifier().verify(BODY, header, ("current",))
+
+
+@pytest.mark.parametrize(
+    "body, header",
+    [
+        (BODY + b" ", sign(BODY, derive_key("current"))),
+        (BODY, sign(BODY, derive_key("other"))),
+        (BODY, sign(BODY, derive_key("current")).replace("sha256", "sha1")),
+        (BODY, ""),
+        (BODY, None),
+    ],
+)
+def test_rejects_bad_signatures(body, header):
+    assert not WebhookVerifier().verify(body, header, ("current",))
+
+
+def test_tenant_keys_are_evicted_least_recently_used():
+    verifier = WebhookVerifier(max_tenants=2)
+    for keys in (("a",), ("b",), ("a",), ("c",)):
+        assert verifier.verify(BODY, sign(BODY, derive_key(keys[0])), keys)
+    assert list(verifier._keys) == [("a",), ("c",)]
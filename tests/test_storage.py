@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from storage import CORRUPT_SUFFIX, AssessmentStore
+
+
+def make_assessment(id, email="candidate@example.com", status="pending"):
+    return {
+        "id": id,
+        "name": "Candidate",
+        "email": email,
+        "status": status,
+        "created_at": "2025-01-01 09:00:00",
+        "updated_at": "2025-01-01 09:00:00",
+    }
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "assessments.jsonl")
+
+
+def open_store(path):
+    return AssessmentStore(path=path, legacy_path=f"{path}.missing", fsync=False)
+
+
+def test_reload_keeps_latest_version(path):
+    store = open_store(path)
+    store.put_many([make_assessment("a"), make_assessment("b")])
+    store.update("a", {"status": "completed", "score": "87"})
+    store.remove_where(lambda record: record.get("id") == "b")
+    store.close()
+
+    reloaded = open_store(path)
+    assert len(reloaded) == 1
+    assert reloaded.get("a") == {
+        **make_assessment("a"),
+        "status": "completed",
+        "score": "87",
+    }
+    assert reloaded.get("b") is None
+    assert [record["id"] for record in reloaded.find_by_status("completed")] == ["a"]
+
+
+def test_insert_many_keeps_existing_records(path):
+    store = open_store(path)
+    store.put(make_assessment("a"))
+    existing = store.insert_many(
+        [make_assessment("a", email="other@example.com"), make_assessment("b")]
+    )
+    assert existing == {"a": make_assessment("a")}
+    assert store.get("a")["email"] == "candidate@example.com"
+    assert "b" in store
+
+
+def test_torn_tail_is_truncated_on_load(path):
+    store = open_store(path)
+    store.put_many([make_assessment("a"), make_assessment("b")])
+    store.close()
+    with open(path, "ab") as file:
+        file.write(b'{"id": "c", "name": "Cand')
+
+    reloaded = open_store(path)
+    assert sorted(record["id"] for record in reloaded) == ["a", "b"]
+    with open(f"{path}{CORRUPT_SUFFIX}", "rb") as file:
+        assert file.read() == b'{"id": "c", "name": "Cand'
+    # The next write lands on a clean line boundary
+    reloaded.put(make_assessment("d"))
+    assert sorted(record["id"] for record in open_store(path)) == ["a", "b", "d"]
+
+
+def test_corrupt_line_stops_load_and_is_cut(path):
+    store = open_store(path)
+    store.put(make_assessment("a"))
+    store.close()
+    with open(path, "ab") as file:
+        file.write(b"not json\n")
+        file.write((json.dumps(make_assessment("b")) + "\n").encode("utf-8"))
+
+    reloaded = open_store(path)
+    assert [record["id"] for record in reloaded] == ["a"]
+    with open(path, "rb") as file:
+        assert file.read().count(b"\n") == 1
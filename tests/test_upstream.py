@@ -0,0 +1,116 @@
+import asyncio
+
+import httpx
+import pytest
+
+import upstream
+from upstream import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+    ResilientClient,
+)
+
+
+def wait_for_recovery(breaker):
+    breaker.opened_at -= breaker.recovery_timeout
+
+
+def test_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_timeout=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure(httpx.ConnectError("refused"))
+    assert breaker.state == CLOSED
+    breaker.before_call()
+    breaker.record_success()
+    assert breaker.failures == 0
+    for _ in range(3):
+        breaker.before_call()
+        breaker.record_failure(httpx.ConnectError("refused"))
+    assert breaker.state == OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+    breaker.before_call()
+    breaker.record_failure(httpx.ConnectError("refused"))
+    wait_for_recovery(breaker)
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    breaker.before_call()
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+    breaker.before_call()
+    breaker.record_failure(httpx.ConnectError("refused"))
+    wait_for_recovery(breaker)
+    breaker.before_call()
+    breaker.record_failure(httpx.ConnectError("refused"))
+    assert breaker.state == OPEN
+    assert breaker.snapshot()["retry_in"] == pytest.approx(30, abs=1)
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_released_probe_frees_the_slot():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+    breaker.before_call()
+    breaker.record_failure(httpx.ConnectError("refused"))
+    wait_for_recovery(breaker)
+    breaker.before_call()
+    breaker.release()
+    breaker.before_call()
+    assert breaker.state == HALF_OPEN
+
+
+def make_client(handler, breaker):
+    client = httpx.AsyncClient(
+        base_url="http://upstream", transport=httpx.MockTransport(handler)
+    )
+    return ResilientClient(client, breaker=breaker)
+
+
+def test_retries_count_as_one_failure(monkeypatch):
+    monkeypatch.setattr(upstream, "RETRY_BASE_DELAY", 0)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    breaker = CircuitBreaker("test", failure_threshold=5)
+    client = make_client(handler, breaker)
+    response = asyncio.run(client.get("/api/packages"))
+    assert response.status_code == 503
+    assert len(calls) == 3
+    assert breaker.failures == 1
+
+
+def test_cancelled_probe_does_not_wedge_the_breaker():
+    async def handler(request):
+        await asyncio.sleep(10)
+        return httpx.Response(200)
+
+    async def main():
+        breaker = CircuitBreaker("test", failure_threshold=1, recovery_timeout=30)
+        breaker.before_call()
+        breaker.record_failure(httpx.ConnectError("refused"))
+        wait_for_recovery(breaker)
+        client = make_client(handler, breaker)
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(client.get("/api/packages"), 0.01)
+        assert breaker.state == HALF_OPEN
+        # The next call is let through as a new probe
+        breaker.before_call()
+
+    asyncio.run(main())
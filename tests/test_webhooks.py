@@ -0,0 +1,30 @@
+from webhooks import coalesce
+
+
+def delivery(payload):
+    return {"url": "https://pinpoint.example.com/webhooks", "payload": payload}
+
+
+def event(id, status="completed", score="87"):
+    return {"id": id, "status": status, "score": score, "report_path": f"reports/{id}"}
+
+
+def test_coalesce_single_delivery_is_sent_as_is():
+    assert coalesce([("1", delivery(event("a")))]) == event("a")
+
+
+def test_coalesce_keeps_latest_payload_per_assessment():
+    deliveries = [
+        ("1", delivery(event("a", status="pending"))),
+        ("2", delivery(event("b"))),
+        ("3", delivery(event("a", score="90"))),
+    ]
+    assert coalesce(deliveries) == {"events": [event("a", score="90"), event("b")]}
+
+
+def test_coalesce_repeated_updates_collapse_to_one_payload():
+    deliveries = [
+        ("1", delivery(event("a", status="pending"))),
+        ("2", delivery(event("a"))),
+    ]
+    assert coalesce(deliveries) == event("a")
@@ -0,0 +1,279 @@
+import asyncio
+import logging
+import random
+import time
+
+import httpx
+
+from metrics import InstrumentedTransport, circuit_rejections, circuit_state
+
+logger = logging.getLogger(__name__)
+
+ASSESSMENT_SERVICE_URL = "http://localhost:8001"
+
+# Shared keep-alive pool for provider -> assessment service calls
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 100
+KEEPALIVE_EXPIRY = 30.0
+CONNECT_TIMEOUT = 5.0
+REQUEST_TIMEOUT = 10.0
+
+# Per-path read timeouts; anything else gets REQUEST_TIMEOUT
+ENDPOINT_TIMEOUTS = {
+    "/api/packages": 2.0,
+    "/api/assessments/": 5.0,
+    "/api/assessments/bulk": 15.0,
+}
+
+# The breaker opens after this many consecutive failures and lets a probe
+# request through once RECOVERY_TIMEOUT seconds have passed
+FAILURE_THRESHOLD = 5
+RECOVERY_TIMEOUT = 30.0
+
+# Idempotent requests are retried this many times; others only when the
+# connection could not be made, since then the request was never sent
+MAX_RETRIES = 2
+RETRY_BASE_DELAY = 0.1
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def create_client(
+    base_url=ASSESSMENT_SERVICE_URL,
+    max_connections=MAX_CONNECTIONS,
+    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+    keepalive_expiry=KEEPALIVE_EXPIRY,
+    connect_timeout=CONNECT_TIMEOUT,
+    request_timeout=REQUEST_TIMEOUT,
+):
+    """
+    Create a pooled async HTTP client for the assessment service
+
+    Args:
+        base_url (str): Base URL of the assessment service
+        max_connections (int): Maximum concurrent connections in the pool
+        max_keepalive_connections (int): Maximum idle connections kept open
+        keepalive_expiry (float): Seconds an idle connection is kept open
+        connect_timeout (float): Seconds allowed to establish a connection
+        request_timeout (float): Seconds allowed for reads, writes and pool waits
+
+    Returns:
+        httpx.AsyncClient: Client to share across requests and close on shutdown
+    """
+    return httpx.AsyncClient(
+        base_url=base_url,
+        # Every call is timed per path and exposed on /metrics
+        transport=InstrumentedTransport(
+            "assessment_service",
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        ),
+        timeout=httpx.Timeout(request_timeout, connect=connect_timeout),
+    )
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker
+
+    Closed: calls go through and failures are counted. After
+    ``failure_threshold`` failures in a row it opens and every call fails fast
+    with ``CircuitOpenError``. Once ``recovery_timeout`` has passed it is half
+    open: a single probe call goes through, closing the breaker on success and
+    re-opening it on failure.
+
+    Args:
+        name (str): Name of the upstream, used in errors and metrics
+        failure_threshold (int): Consecutive failures that open the breaker
+        recovery_timeout (float): Seconds to stay open before probing
+    """
+
+    def __init__(
+        self,
+        name,
+        failure_threshold=FAILURE_THRESHOLD,
+        recovery_timeout=RECOVERY_TIMEOUT,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self._probing = False
+        circuit_state.set(name, value=0)
+
+    def before_call(self):
+        """
+        Check whether a call may go through
+
+        Raises:
+            CircuitOpenError: While the breaker is open, or a probe is already running
+        """
+        if self.state == OPEN:
+            remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+            if remaining > 0:
+                circuit_rejections.inc(self.name)
+                raise CircuitOpenError(
+                    f"{self.name} is unavailable, retrying in {remaining:.0f}s"
+                )
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probing:
+                circuit_rejections.inc(self.name)
+                raise CircuitOpenError(f"{self.name} is unavailable, probe in progress")
+            self._probing = True
+
+    def record_success(self):
+        self._probing = False
+        self.failures = 0
+        if self.state != CLOSED:
+            logger.info("Circuit for %s closed", self.name)
+            self._set_state(CLOSED)
+
+    def release(self):
+        """End a call that has no outcome, e.g. a cancelled one, freeing the probe slot"""
+        self._probing = False
+
+    def record_failure(self, error):
+        self._probing = False
+        self.failures += 1
+        self.last_error = str(error) or type(error).__name__
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != OPEN:
+                logger.warning("Circuit for %s opened: %s", self.name, self.last_error)
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def snapshot(self):
+        """
+        Describe the breaker for status endpoints
+
+        Returns:
+            dict: State, consecutive failures, last error and seconds until the
+            next probe
+        """
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = max(
+                0.0, self.opened_at + self.recovery_timeout - time.monotonic()
+            )
+        return {
+            "name": self.name,
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "last_error": self.last_error,
+            "retry_in": retry_in,
+        }
+
+    def _set_state(self, state):
+        self.state = state
+        circuit_state.set(self.name, value=(CLOSED, HALF_OPEN, OPEN).index(state))
+
+
+class ResilientClient:
+    """
+    Wraps an ``httpx.AsyncClient`` with per-endpoint timeouts, retries and a breaker
+
+    Transport errors, timeouts and 5xx responses count as upstream failures;
+    4xx responses are the caller's problem and count as successes. A request
+    counts once towards the breaker, after its last retry. ``get`` and
+    ``post`` take the same arguments as on ``httpx.AsyncClient``.
+
+    Args:
+        client (httpx.AsyncClient): The pooled client to send requests with
+        breaker (CircuitBreaker): Breaker guarding the upstream
+        timeouts (dict): Read timeout in seconds per URL path
+        max_retries (int): Retries for idempotent requests
+    """
+
+    def __init__(
+        self, client, breaker=None, timeouts=ENDPOINT_TIMEOUTS, max_retries=MAX_RETRIES
+    ):
+        self.client = client
+        self.breaker = breaker or CircuitBreaker("assessment_service")
+        self.timeouts = timeouts
+        self.max_retries = max_retries
+
+    async def get(self, url, **kwargs):
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url, **kwargs):
+        return await self.request("POST", url, **kwargs)
+
+    async def request(self, method, url, idempotent=None, **kwargs):
+        """
+        Send a request through the breaker, retrying where that is safe
+
+        Args:
+            method (str): HTTP method
+            url (str): Path relative to the client's base URL
+            idempotent (bool): Override whether the request may be retried after
+                it was sent
+            **kwargs: Passed on to ``httpx.AsyncClient.request``
+
+        Returns:
+            httpx.Response: The response, which may be a 4xx
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+            httpx.HTTPError: If the last attempt failed
+        """
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault(
+            "timeout",
+            httpx.Timeout(
+                self.timeouts.get(url, REQUEST_TIMEOUT), connect=CONNECT_TIMEOUT
+            ),
+        )
+        # The breaker sees one outcome per request, however many attempts it took
+        self.breaker.before_call()
+        try:
+            return await self._send(method, url, idempotent, **kwargs)
+        except BaseException:
+            # Cancelled, or failed outside httpx: a half-open breaker must not
+            # wait forever for this probe to report back
+            self.breaker.release()
+            raise
+
+    async def _send(self, method, url, idempotent, **kwargs):
+        attempt = 0
+        while True:
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                if response.status_code >= 500:
+                    raise httpx.HTTPStatusError(
+                        f"{response.status_code} from {url}",
+                        request=response.request,
+                        response=response,
+                    )
+            except httpx.HTTPError as e:
+                # A failed connect means the request never reached upstream
+                retryable = idempotent or isinstance(
+                    e, (httpx.ConnectError, httpx.ConnectTimeout)
+                )
+                if not retryable or attempt >= self.max_retries:
+                    self.breaker.record_failure(e)
+                    if isinstance(e, httpx.HTTPStatusError):
+                        return e.response
+                    raise
+                attempt += 1
+                await asyncio.sleep(random.uniform(0, RETRY_BASE_DELAY * 2**attempt))
+                continue
+            self.breaker.record_success()
+            return response
+
+    async def aclose(self):
+        await self.client.aclose()
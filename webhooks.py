@@ -0,0 +1,496 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import time
+import uuid
+from collections import deque
+from urllib.parse import urlsplit
+
+import httpx
+
+from metrics import InstrumentedTransport, observe_db
+from signing import SIGNATURE_HEADER, sign
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_PATH = "webhook_outbox.sqlite3"
+
+WORKERS = 8
+PER_HOST_LIMIT = 4
+MAX_ATTEMPTS = 8
+BASE_RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 300.0
+# Client errors worth retrying; any other 4xx response is dead-lettered at once
+RETRYABLE_CLIENT_ERRORS = (408, 429)
+DELIVERY_TIMEOUT = 10.0
+# Updates for the same webhook URL within this many seconds are sent as one POST
+BATCH_WINDOW = 0.5
+MAX_BATCH_SIZE = 100
+# Each dispatcher refreshes its heartbeat this often; pending deliveries owned by
+# a dispatcher whose heartbeat is older than OWNER_TIMEOUT are adopted by another
+HEARTBEAT_INTERVAL = 5.0
+OWNER_TIMEOUT = 30.0
+
+PENDING = "pending"
+DEAD = "dead"
+
+
+class WebhookDispatcher:
+    """
+    Background webhook delivery with a persistent outbox
+
+    Deliveries are written to a SQLite outbox before they are queued, so they
+    survive restarts. Deliveries to the same URL within ``batch_window`` are
+    coalesced into one POST: a single update is sent as is, several are sent
+    as ``{"events": [...]}`` keeping only the latest update per assessment id.
+    A bounded pool of workers posts batches with a per-host concurrency limit;
+    a batch for a host already at its limit is parked until one of that host's
+    requests finishes, so a slow host never ties up workers other hosts need.
+    Failures are retried with exponential backoff and full jitter; deliveries
+    that exhaust their attempts, or are refused with a client error that a
+    retry would not fix, move to a dead-letter state.
+
+    Several server processes can share one outbox. Every delivery is owned by
+    the dispatcher that enqueued it, so a row is only ever sent by one process;
+    deliveries left behind by a stopped or crashed process are adopted by a
+    live one once its heartbeat goes stale.
+
+    Args:
+        outbox_path (str): Path to the SQLite outbox database
+        workers (int): Number of concurrent delivery workers
+        per_host_limit (int): Maximum in-flight deliveries per webhook host
+        max_attempts (int): Attempts before a delivery is dead-lettered
+        base_delay (float): Backoff delay in seconds after the first failure
+        max_delay (float): Upper bound for the backoff delay in seconds
+        timeout (float): Seconds allowed for each delivery attempt
+        batch_window (float): Seconds to collect updates for a URL before sending them
+        max_batch_size (int): Maximum number of updates sent in one POST
+        signing_key (bytes): Key from ``signing.derive_key``; when set every
+            body is signed in the ``X-Verify`` header
+    """
+
+    def __init__(
+        self,
+        outbox_path=OUTBOX_PATH,
+        workers=WORKERS,
+        per_host_limit=PER_HOST_LIMIT,
+        max_attempts=MAX_ATTEMPTS,
+        base_delay=BASE_RETRY_DELAY,
+        max_delay=MAX_RETRY_DELAY,
+        timeout=DELIVERY_TIMEOUT,
+        batch_window=BATCH_WINDOW,
+        max_batch_size=MAX_BATCH_SIZE,
+        signing_key=None,
+    ):
+        self.workers = workers
+        self.per_host_limit = per_host_limit
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self.batch_window = batch_window
+        self.max_batch_size = max_batch_size
+        self.signing_key = signing_key
+
+        self._db = sqlite3.connect(outbox_path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                created_at REAL NOT NULL,
+                last_error TEXT,
+                owner TEXT
+            )
+            """
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outbox)")}
+        if "owner" not in columns:
+            self._db.execute("ALTER TABLE outbox ADD COLUMN owner TEXT")
+        self._db.execute("CREATE INDEX IF NOT EXISTS outbox_status ON outbox (status)")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS dispatchers (
+                owner TEXT PRIMARY KEY,
+                heartbeat_at REAL NOT NULL
+            )
+            """
+        )
+        self._db.commit()
+
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+
+        self._pending = {}
+        self._queue = None
+        self._tasks = []
+        self._heartbeat = None
+        self._timers = {}
+        self._buffers = {}
+        self._host_in_flight = {}
+        self._host_waiting = {}
+        self._in_flight = 0
+        self._client = None
+        self._metrics = {
+            "enqueued": 0,
+            "batches": 0,
+            "delivered": 0,
+            "retried": 0,
+            "dead_lettered": 0,
+            "attempt_seconds_total": 0.0,
+            "attempts": 0,
+            "delivery_seconds_total": 0.0,
+            "delivery_seconds_max": 0.0,
+        }
+
+    def enqueue(self, url, payload):
+        """
+        Persist a webhook delivery and hand it to the workers
+
+        Args:
+            url (str): The webhook URL to POST to
+            payload (dict): JSON body to deliver
+
+        Returns:
+            str: The delivery id
+        """
+        id = str(uuid.uuid4())
+        now = time.time()
+        body = json.dumps(payload)
+        started = time.perf_counter()
+        self._db.execute(
+            "INSERT INTO outbox (id, url, payload, status, next_attempt_at, created_at, owner) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (id, url, body, PENDING, now, now, self.owner),
+        )
+        self._db.commit()
+        observe_db("outbox_write", started, len(body))
+        self._pending[id] = {
+            "url": url,
+            "payload": payload,
+            "attempts": 0,
+            "created_at": now,
+        }
+        self._metrics["enqueued"] += 1
+        if self._queue is not None:
+            self._buffer(url, id)
+        return id
+
+    async def start(self):
+        """Start the workers and requeue deliveries left in the outbox"""
+        self._queue = asyncio.Queue()
+        self._client = httpx.AsyncClient(
+            transport=InstrumentedTransport("webhook", target="host", verify=False),
+            timeout=self.timeout,
+        )
+        self._pending = {}
+        self._beat()
+        recovered = self._adopt()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._heartbeat = asyncio.create_task(self._keep_alive())
+        logger.info("Webhook dispatcher started with %d pending deliveries", recovered)
+
+    async def stop(self):
+        """Stop the workers; undelivered webhooks stay in the outbox for next start"""
+        for timer in self._timers.values():
+            timer.cancel()
+        for _, timer in self._buffers.values():
+            timer.cancel()
+        tasks = self._tasks + ([self._heartbeat] if self._heartbeat is not None else [])
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        self._heartbeat = None
+        # Hand undelivered rows back so a live process adopts them straight away
+        self._db.execute(
+            "UPDATE outbox SET owner = NULL WHERE owner = ? AND status = ?",
+            (self.owner, PENDING),
+        )
+        self._db.execute("DELETE FROM dispatchers WHERE owner = ?", (self.owner,))
+        self._db.commit()
+        self._timers = {}
+        self._buffers = {}
+        self._host_in_flight = {}
+        self._host_waiting = {}
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self):
+        """
+        Report queue depth and delivery latency
+
+        Returns:
+            dict: Counters, queue depth and average/max latencies in seconds
+        """
+        metrics = self._metrics
+        return {
+            "queue_depth": len(self._pending),
+            "ready": self._queue.qsize() if self._queue is not None else 0,
+            "in_flight": self._in_flight,
+            "host_waiting": sum(
+                len(waiting) for waiting in self._host_waiting.values()
+            ),
+            "enqueued": metrics["enqueued"],
+            "batches": metrics["batches"],
+            "delivered": metrics["delivered"],
+            "retried": metrics["retried"],
+            "dead_lettered": metrics["dead_lettered"],
+            "dead_letter_total": self._db.execute(
+                "SELECT COUNT(*) FROM outbox WHERE status = ?", (DEAD,)
+            ).fetchone()[0],
+            "attempt_latency_avg": (
+                metrics["attempt_seconds_total"] / metrics["attempts"]
+                if metrics["attempts"]
+                else 0.0
+            ),
+            "delivery_latency_avg": (
+                metrics["delivery_seconds_total"] / metrics["delivered"]
+                if metrics["delivered"]
+                else 0.0
+            ),
+            "delivery_latency_max": metrics["delivery_seconds_max"],
+        }
+
+    def dead_letters(self, limit=100):
+        """
+        List deliveries that exhausted their retries
+
+        Args:
+            limit (int): Maximum number of entries to return
+
+        Returns:
+            list[dict]: Dead-lettered deliveries, newest first
+        """
+        rows = self._db.execute(
+            "SELECT id, url, payload, attempts, created_at, last_error FROM outbox "
+            "WHERE status = ? ORDER BY created_at DESC LIMIT ?",
+            (DEAD, limit),
+        ).fetchall()
+        return [
+            {
+                "id": id,
+                "url": url,
+                "payload": json.loads(payload),
+                "attempts": attempts,
+                "created_at": created_at,
+                "last_error": last_error,
+            }
+            for id, url, payload, attempts, created_at, last_error in rows
+        ]
+
+    def _beat(self):
+        self._db.execute(
+            "INSERT OR REPLACE INTO dispatchers (owner, heartbeat_at) VALUES (?, ?)",
+            (self.owner, time.time()),
+        )
+        self._db.commit()
+
+    async def _keep_alive(self):
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                self._beat()
+                self._adopt()
+            except sqlite3.Error as e:
+                logger.warning("Webhook dispatcher heartbeat failed: %s", e)
+
+    def _adopt(self):
+        """Claim orphaned pending rows and schedule every owned row not yet in memory"""
+        now = time.time()
+        self._db.execute(
+            "UPDATE outbox SET owner = ? WHERE status = ? AND (owner IS NULL OR owner NOT IN "
+            "(SELECT owner FROM dispatchers WHERE heartbeat_at >= ?))",
+            (self.owner, PENDING, now - OWNER_TIMEOUT),
+        )
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT id, url, payload, attempts, next_attempt_at, created_at "
+            "FROM outbox WHERE status = ? AND owner = ?",
+            (PENDING, self.owner),
+        ).fetchall()
+        batches = {}
+        for id, url, payload, attempts, next_attempt_at, created_at in rows:
+            if id in self._pending:
+                continue
+            self._pending[id] = {
+                "url": url,
+                "payload": json.loads(payload),
+                "attempts": attempts,
+                "created_at": created_at,
+            }
+            batches.setdefault((url, attempts), []).append((id, next_attempt_at))
+        for entries in batches.values():
+            for start in range(0, len(entries), self.max_batch_size):
+                chunk = entries[start : start + self.max_batch_size]
+                due = max(next_attempt_at for _, next_attempt_at in chunk)
+                self._schedule(tuple(id for id, _ in chunk), max(0.0, due - now))
+        return sum(len(entries) for entries in batches.values())
+
+    async def _worker(self):
+        while True:
+            batch = await self._queue.get()
+            deliveries = [
+                (id, self._pending[id]) for id in batch if id in self._pending
+            ]
+            if deliveries:
+                host = urlsplit(deliveries[0][1]["url"]).netloc
+                if self._host_in_flight.get(host, 0) >= self.per_host_limit:
+                    # Parked instead of awaited, so this worker moves on to other hosts
+                    self._host_waiting.setdefault(host, deque()).append(batch)
+                else:
+                    await self._send(host, deliveries)
+            self._queue.task_done()
+
+    async def _send(self, host, deliveries):
+        self._host_in_flight[host] = self._host_in_flight.get(host, 0) + 1
+        self._in_flight += 1
+        try:
+            await self._attempt(deliveries)
+        finally:
+            self._in_flight -= 1
+            self._host_in_flight[host] -= 1
+            if not self._host_in_flight[host]:
+                del self._host_in_flight[host]
+            waiting = self._host_waiting.get(host)
+            if waiting:
+                self._queue.put_nowait(waiting.popleft())
+                if not waiting:
+                    del self._host_waiting[host]
+
+    async def _attempt(self, deliveries):
+        url = deliveries[0][1]["url"]
+        attempts = max(delivery["attempts"] for _, delivery in deliveries) + 1
+        for _, delivery in deliveries:
+            delivery["attempts"] = attempts
+        ids = [id for id, _ in deliveries]
+
+        start = time.perf_counter()
+        permanent = False
+        try:
+            body = json.dumps(coalesce(deliveries)).encode("utf-8")
+            headers = {"Content-Type": "application/json"}
+            if self.signing_key is not None:
+                headers[SIGNATURE_HEADER] = sign(body, self.signing_key)
+            response = await self._client.post(url, content=body, headers=headers)
+            response.raise_for_status()
+            error = None
+        except httpx.HTTPStatusError as e:
+            error = str(e)
+            status = e.response.status_code
+            permanent = 400 <= status < 500 and status not in RETRYABLE_CLIENT_ERRORS
+        except Exception as e:
+            error = str(e) or type(e).__name__
+        self._metrics["attempts"] += 1
+        self._metrics["attempt_seconds_total"] += time.perf_counter() - start
+
+        if error is None:
+            self._finish(ids, attempts)
+            now = time.time()
+            self._metrics["batches"] += 1
+            for _, delivery in deliveries:
+                latency = now - delivery["created_at"]
+                self._metrics["delivered"] += 1
+                self._metrics["delivery_seconds_total"] += latency
+                self._metrics["delivery_seconds_max"] = max(
+                    self._metrics["delivery_seconds_max"], latency
+                )
+        elif permanent or attempts >= self.max_attempts:
+            self._finish(ids, attempts, error)
+            self._metrics["dead_lettered"] += len(ids)
+            logger.error(
+                "Webhook batch of %d to %s dead-lettered: %s", len(ids), url, error
+            )
+        else:
+            delay = random.uniform(
+                0, min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+            )
+            self._db.executemany(
+                "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE id = ?",
+                [(attempts, time.time() + delay, error, id) for id in ids],
+            )
+            self._db.commit()
+            self._metrics["retried"] += len(ids)
+            logger.warning(
+                "Webhook batch of %d to %s attempt %d failed, retrying in %.1fs: %s",
+                len(ids),
+                url,
+                attempts,
+                delay,
+                error,
+            )
+            self._schedule(tuple(ids), delay)
+
+    def _finish(self, ids, attempts, error=None):
+        if error is None:
+            # Delivered rows are dropped so the outbox only holds outstanding work
+            self._db.executemany(
+                "DELETE FROM outbox WHERE id = ?", [(id,) for id in ids]
+            )
+        else:
+            self._db.executemany(
+                "UPDATE outbox SET status = ?, attempts = ?, last_error = ? WHERE id = ?",
+                [(DEAD, attempts, error, id) for id in ids],
+            )
+        self._db.commit()
+        for id in ids:
+            self._pending.pop(id, None)
+
+    def _buffer(self, url, id):
+        if self.batch_window <= 0:
+            self._queue.put_nowait((id,))
+            return
+        buffered = self._buffers.get(url)
+        if buffered is None:
+            loop = asyncio.get_running_loop()
+            timer = loop.call_later(self.batch_window, self._flush, url)
+            buffered = self._buffers[url] = ([], timer)
+        buffered[0].append(id)
+        if len(buffered[0]) >= self.max_batch_size:
+            buffered[1].cancel()
+            self._flush(url)
+
+    def _flush(self, url):
+        ids, _ = self._buffers.pop(url)
+        self._queue.put_nowait(tuple(ids))
+
+    def _schedule(self, batch, delay):
+        if delay <= 0:
+            self._queue.put_nowait(batch)
+            return
+        loop = asyncio.get_running_loop()
+        self._timers[batch] = loop.call_later(delay, self._ready, batch)
+
+    def _ready(self, batch):
+        self._timers.pop(batch, None)
+        self._queue.put_nowait(batch)
+
+
+def coalesce(deliveries):
+    """
+    Build the request body for a batch of deliveries to one URL
+
+    Args:
+        deliveries (list[tuple[str, dict]]): Outbox ids and deliveries, oldest first
+
+    Returns:
+        dict: The single payload, or ``{"events": [...]}`` holding the latest
+        payload per assessment id in first-seen order
+    """
+    if len(deliveries) == 1:
+        return deliveries[0][1]["payload"]
+    latest = {}
+    for id, delivery in deliveries:
+        payload = delivery["payload"]
+        latest[payload.get("id", id)] = payload
+    events = list(latest.values())
+    return events[0] if len(events) == 1 else {"events": events}